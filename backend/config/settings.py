@@ -1,4 +1,4 @@
-from pydantic_settings import BaseSettings
+from pydantic_settings import BaseSettings, SettingsConfigDict
 from typing import Optional
 
 class Settings(BaseSettings):
@@ -23,10 +23,21 @@ class Settings(BaseSettings):
     snowflake_warehouse: str = ""
     snowflake_database: str = ""
     snowflake_schema: str = ""
+    snowflake_pool_size: int = 4
+    snowflake_pool_max_idle_seconds: int = 1800
+
+    # LLM Configuration
+    max_concurrent_llm_calls: int = 8
+
+    # Cache Configuration
+    agents_cache_ttl_seconds: int = 3600
+    sessions_cache_ttl_seconds: int = 5
+
+    # WebSocket Configuration
+    ws_message_queue_size: int = 100
     
-    class Config:
-        env_file = ".env"
-        case_sensitive = False
+    # Frozen: settings are read-only after load, so values can be cached safely
+    model_config = SettingsConfigDict(frozen=True, env_file=".env", case_sensitive=False)
 
 # Global settings instance
 settings = Settings()
@@ -1,15 +1,34 @@
-import snowflake.connector
-from typing import Generator
+import queue
+import time
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Generator
 from .settings import settings
 
+if TYPE_CHECKING:
+    import snowflake.connector
 
-def get_snowflake_connection() -> Generator[snowflake.connector.SnowflakeConnection, None, None]:
-    account = (settings.snowflake_account or "").strip()
-    user = (settings.snowflake_user or "").strip()
-    password = (settings.snowflake_password or "").strip()
-    warehouse = (settings.snowflake_warehouse or "").strip()
-    database = (settings.snowflake_database or "").strip()
-    schema = (settings.snowflake_schema or "").strip()
+
+# Settings are frozen, so the cleaned connection parameters are computed once
+_ACCOUNT = (settings.snowflake_account or "").strip()
+_USER = (settings.snowflake_user or "").strip()
+_PASSWORD = (settings.snowflake_password or "").strip()
+_WAREHOUSE = (settings.snowflake_warehouse or "").strip()
+_DATABASE = (settings.snowflake_database or "").strip()
+_SCHEMA = (settings.snowflake_schema or "").strip()
+
+# Idle connections as (connection, released_at). Thread-safe, since sync
+# dependencies run in the threadpool; LIFO so the most recently used
+# connection is handed out first.
+_pool: "queue.LifoQueue" = queue.LifoQueue(maxsize=settings.snowflake_pool_size)
+
+
+def _connect() -> "snowflake.connector.SnowflakeConnection":
+    """Open a new connection with warehouse/database/schema selected"""
+    # Imported on first use: the connector is slow to import and not needed to boot the app
+    import snowflake.connector
+
+    account, user, password = _ACCOUNT, _USER, _PASSWORD
+    warehouse, database, schema = _WAREHOUSE, _DATABASE, _SCHEMA
 
     try:
         conn = snowflake.connector.connect(
@@ -20,7 +39,12 @@ def get_snowflake_connection() -> Generator[snowflake.connector.SnowflakeConnect
             database=database or None,
             schema=schema or None,
         )
+    except Exception as e:
+        print(f"Snowflake connection error: {e}")
+        print(f"Account: {account}, User: {user}, Warehouse: {warehouse}, Database: {database}, Schema: {schema}")
+        raise
 
+    try:
         # Explicitly set context in case connector ignored blanks/whitespace
         cur = conn.cursor()
         try:
@@ -32,16 +56,90 @@ def get_snowflake_connection() -> Generator[snowflake.connector.SnowflakeConnect
                 cur.execute(f"USE SCHEMA {schema}")
         finally:
             cur.close()
-
-        yield conn
-    except Exception as e:
-        print(f"Snowflake connection error: {e}")
-        print(f"Account: {account}, User: {user}, Warehouse: {warehouse}, Database: {database}, Schema: {schema}")
+    except Exception:
+        conn.close()
         raise
-    finally:
+
+    return conn
+
+
+def acquire_connection() -> "snowflake.connector.SnowflakeConnection":
+    """Take an idle pooled connection, or open a new one when none is usable"""
+    now = time.monotonic()
+    while True:
+        try:
+            conn, released_at = _pool.get_nowait()
+        except queue.Empty:
+            return _connect()
+        if conn.is_closed():
+            continue
+        if now - released_at > settings.snowflake_pool_max_idle_seconds:
+            # The server may already have expired the session
+            conn.close()
+            continue
+        return conn
+
+
+def release_connection(conn: "snowflake.connector.SnowflakeConnection"):
+    """Return a connection to the pool, closing it if the pool is already full"""
+    if conn.is_closed():
+        return
+    try:
+        _pool.put_nowait((conn, time.monotonic()))
+    except queue.Full:
+        conn.close()
+
+
+def close_snowflake_pool():
+    """Close every idle pooled connection (application shutdown)"""
+    while True:
+        try:
+            conn, _ = _pool.get_nowait()
+        except queue.Empty:
+            return
         try:
             conn.close()
         except Exception:
             pass
 
 
+def _is_connector_error(exc: BaseException) -> bool:
+    """Whether an exception is, or was raised while handling, a connector error"""
+    import snowflake.connector.errors
+
+    seen = set()
+    while exc is not None and id(exc) not in seen:
+        if isinstance(exc, snowflake.connector.errors.Error):
+            return True
+        seen.add(id(exc))
+        exc = exc.__cause__ or exc.__context__
+    return False
+
+
+@contextmanager
+def snowflake_connection() -> Generator["snowflake.connector.SnowflakeConnection", None, None]:
+    """
+    Borrow a pooled connection for the duration of the block, in a request
+    handler, dependency or background task. A connection that hit a connector
+    error (routes often re-raise it as an HTTPException) may be broken, so it
+    is closed instead of going back to the pool.
+    """
+    conn = acquire_connection()
+    try:
+        yield conn
+    except BaseException as e:
+        if _is_connector_error(e):
+            try:
+                conn.close()
+            except Exception:
+                pass
+        else:
+            release_connection(conn)
+        raise
+    else:
+        release_connection(conn)
+
+
+def get_snowflake_connection() -> Generator["snowflake.connector.SnowflakeConnection", None, None]:
+    with snowflake_connection() as conn:
+        yield conn
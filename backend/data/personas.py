@@ -1,4 +1,9 @@
 # Personas data matching frontend/src/data/personas.ts
+import random
+from functools import lru_cache
+
+# Fields exposed on persona cards returned by the ranking API
+PERSONA_CARD_FIELDS = ('id', 'name', 'title', 'location', 'industry', 'expertise', 'experience')
 
 PERSONAS_BY_LOCATION = {
     'New York': [
@@ -271,12 +276,36 @@ PERSONAS_BY_LOCATION = {
     ]
 }
 
+# The data is read-only: store the list fields as tuples so they can't be
+# mutated through a shared reference and hash as cache keys as-is
+for _location_personas in PERSONAS_BY_LOCATION.values():
+    for _persona in _location_personas:
+        _persona['expertise'] = tuple(_persona['expertise'])
+        _persona['insights'] = tuple(_persona['insights'])
+del _location_personas, _persona
+
+# Flat view of the static data above, built once at import
+_ALL_PERSONAS = tuple(
+    persona
+    for location_personas in PERSONAS_BY_LOCATION.values()
+    for persona in location_personas
+)
+
 def get_all_personas():
     """Get all personas from all locations"""
-    all_personas = []
-    for location_personas in PERSONAS_BY_LOCATION.values():
-        all_personas.extend(location_personas)
-    return all_personas
+    return _ALL_PERSONAS
+
+@lru_cache(maxsize=1)
+def get_persona_cards():
+    """Get the card projection of every persona keyed by id, built once"""
+    cards = {}
+    for persona in get_all_personas():
+        card = {field: persona[field] for field in PERSONA_CARD_FIELDS}
+        # PersonaCard.expertise is a list and trusted cards skip validation,
+        # so hand it a list rather than the frozen tuple
+        card['expertise'] = list(card['expertise'])
+        cards[persona['id']] = card
+    return cards
 
 def get_personas_for_location(location_name: str):
     """Get personas for a specific location"""
@@ -284,6 +313,4 @@ def get_personas_for_location(location_name: str):
 
 def get_random_personas(count: int = 5):
     """Get a random selection of personas"""
-    import random
-    all_personas = get_all_personas()
-    return random.sample(all_personas, min(count, len(all_personas)))
+    return random.sample(_ALL_PERSONAS, min(count, len(_ALL_PERSONAS)))
@@ -1,13 +1,28 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+import orjson
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
-from routes import analyze, sessions, websocket, voice_consult
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
+from routes import analyze, sessions, websocket, voice_consult, personas
 from config.settings import settings
+from config.snowflake import close_snowflake_pool
+from services.http_client import close_http_client
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Release shared resources on shutdown"""
+    yield
+    await close_http_client()
+    close_snowflake_pool()
 
 # Create FastAPI app
 app = FastAPI(
     title="Tunnel AI Backend",
     description="AI-powered market research platform with voice consultations",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # Add CORS middleware
@@ -15,33 +30,43 @@ app.add_middleware(
     CORSMiddleware,
     allow_origins=[settings.frontend_url, "http://localhost:3000", "http://localhost:5173"],
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST", "DELETE", "OPTIONS"],
+    allow_headers=["Authorization", "Content-Type"],
+    max_age=86400,  # let browsers cache preflights for a day
 )
 
+# Compress JSON responses; ranking and analysis payloads are repetitive text
+app.add_middleware(GZipMiddleware, minimum_size=500, compresslevel=5)
+
 # Include routers
 app.include_router(analyze.router, prefix="/api", tags=["Analysis"])
 app.include_router(sessions.router, prefix="/api", tags=["Sessions"])
 app.include_router(websocket.router, tags=["WebSocket"])
 app.include_router(voice_consult.router, prefix="/api", tags=["Voice Consultation"])
+app.include_router(personas.router, prefix="/api", tags=["Personas"])
+
+# Static bodies for the probe endpoints, encoded once instead of per request
+ROOT_BODY = orjson.dumps({
+    "message": "Tunnel AI Backend is running",
+    "version": "1.0.0",
+    "docs": "/docs"
+})
+
+HEALTH_BODY = orjson.dumps({
+    "status": "healthy",
+    "service": "Tunnel AI Backend",
+    "version": "1.0.0"
+})
 
 @app.get("/")
 async def root():
     """Root endpoint"""
-    return {
-        "message": "Tunnel AI Backend is running",
-        "version": "1.0.0",
-        "docs": "/docs"
-    }
+    return Response(content=ROOT_BODY, media_type="application/json")
 
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
-    return {
-        "status": "healthy",
-        "service": "Tunnel AI Backend",
-        "version": "1.0.0"
-    }
+    return Response(content=HEALTH_BODY, media_type="application/json")
 
 if __name__ == "__main__":
     import uvicorn
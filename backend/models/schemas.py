@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, field_validator
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 
@@ -68,6 +68,9 @@ class IdeaAnalyzeRequest(BaseModel):
     max_personas: int = 5
 
 class PersonaCard(BaseModel):
+    # Frozen: prebuilt cards for the static personas are shared across requests
+    model_config = ConfigDict(frozen=True, extra='ignore')
+
     id: str
     name: str
     title: str
@@ -77,6 +80,8 @@ class PersonaCard(BaseModel):
     experience: str
 
 class PersonaEvaluation(BaseModel):
+    model_config = ConfigDict(frozen=True, extra='ignore')
+
     persona: PersonaCard
     relevanceScore: float
     rating: int
@@ -94,3 +99,36 @@ class IdeaAnalyzeResponse(BaseModel):
     enhancedIdea: str
     results: list[PersonaEvaluation]
     summary: IdeaAnalyzeSummary
+
+# --------------------------
+# OpenAI ranking JSON output
+# --------------------------
+
+class RankedPersonaOutput(BaseModel):
+    persona_id: str
+    relevance_score: float = 0.8
+    rating: int = 7
+    sentiment: str = "neutral"
+    key_insight: str = "Product shows potential"
+    detailed_analysis: str = "Detailed analysis of market fit"
+
+    @field_validator('rating', mode='before')
+    @classmethod
+    def round_rating(cls, value):
+        # The model sometimes answers with half points such as 7.5
+        if isinstance(value, float):
+            return round(value)
+        return value
+
+class RankingSummaryOutput(BaseModel):
+    average_rating: float = 7.0
+    overall_sentiment: str = "neutral"
+    top_concerns: list[str] = ["Market competition", "Implementation complexity", "User adoption"]
+    top_opportunities: list[str] = ["Strong market demand", "Innovative approach", "Scalable model"]
+
+class RankingOutput(BaseModel):
+    enhanced_idea: str
+    # Validated one by one (as RankedPersonaOutput) so a malformed evaluation
+    # drops only itself, not the whole response
+    evaluations: list[dict[str, Any]]
+    summary: RankingSummaryOutput = RankingSummaryOutput()
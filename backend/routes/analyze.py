@@ -1,15 +1,25 @@
 from fastapi import APIRouter, HTTPException, BackgroundTasks, Depends
-from typing import Dict, Any
-from models.schemas import AnalysisRequest, AnalysisResponse, IdeaAnalyzeRequest, IdeaAnalyzeResponse
+from pydantic import TypeAdapter
+from typing import Dict, Any, List
+from models.schemas import AnalysisRequest, AnalysisResponse, AnalysisResults, IdeaAnalyzeRequest, IdeaAnalyzeResponse, Persona, Opinion, SentimentBreakdown
 from services.analysis_service import AnalysisService
-from config.snowflake import get_snowflake_connection
-import json
+from data.personas import get_random_personas
+from config.snowflake import get_snowflake_connection, snowflake_connection
+from routes.sessions import CREATE_SESSION_SQL, invalidate_sessions_cache
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 analysis_service = AnalysisService()
 
+# (De)serializers for the stored result columns, handled in one pass by pydantic-core
+PERSONAS_ADAPTER = TypeAdapter(List[Persona])
+OPINIONS_ADAPTER = TypeAdapter(List[Opinion])
+
 @router.post("/analyze", response_model=AnalysisResponse)
-async def analyze_product_idea(
+def analyze_product_idea(
     request: AnalysisRequest,
     background_tasks: BackgroundTasks,
     conn = Depends(get_snowflake_connection)
@@ -18,29 +28,21 @@ async def analyze_product_idea(
     Analyze a product idea and return market research results
     """
     try:
-        # Create new session in Snowflake
-        cur = conn.cursor()
-        try:
-            cur.execute(
-                "INSERT INTO SESSIONS (PRODUCT_IDEA, STATUS, CREATED_AT, UPDATED_AT) VALUES (%s, %s, CURRENT_TIMESTAMP(), CURRENT_TIMESTAMP())",
-                (request.product_idea, "processing"),
-            )
-        finally:
-            cur.close()
-
-        # Fetch the latest session id for this product idea
+        # Create new session in Snowflake under an id drawn from the sequence,
+        # so concurrent inserts of the same idea can't be confused. Shares the
+        # statement with POST /sessions; the row read back starts with the id
         cur = conn.cursor()
         try:
-            cur.execute(
-                "SELECT ID FROM SESSIONS WHERE PRODUCT_IDEA=%s ORDER BY CREATED_AT DESC LIMIT 1",
-                (request.product_idea,),
-            )
+            cur.execute(CREATE_SESSION_SQL, (request.product_idea, "processing"), num_statements=3)
+            cur.nextset()
+            cur.nextset()
             row = cur.fetchone()
             if not row:
                 raise RuntimeError("Failed to retrieve session id after insert")
             session_id = int(row[0])
         finally:
             cur.close()
+        invalidate_sessions_cache()
         
         # Run analysis in background
         background_tasks.add_task(run_analysis_background, request.product_idea, session_id)
@@ -68,61 +70,49 @@ async def run_analysis_background(product_idea: str, session_id: int):
         # Run the analysis
         analysis_response = await analysis_service.run_analysis(product_idea, session_id)
         
-        # Save results to Snowflake
-        save_analysis_results(session_id, analysis_response)
+        # Save results to Snowflake; the connector blocks, so keep it off the event loop
+        await asyncio.to_thread(save_analysis_results, session_id, analysis_response)
         
     except Exception as e:
-        print(f"Background analysis error: {e}")
+        logger.error("Background analysis error: %s", e)
         # Update session status to failed
-        import snowflake.connector
-        from config.settings import settings
-        conn = snowflake.connector.connect(
-            account=settings.snowflake_account,
-            user=settings.snowflake_user,
-            password=settings.snowflake_password,
-            warehouse=settings.snowflake_warehouse,
-            database=settings.snowflake_database,
-            schema=settings.snowflake_schema,
-        )
+        await asyncio.to_thread(mark_session_failed, session_id)
+
+def mark_session_failed(session_id: int):
+    """Set a session's status to failed"""
+    with snowflake_connection() as conn:
+        cur = conn.cursor()
         try:
-            cur = conn.cursor()
-            try:
-                cur.execute(
-                    "UPDATE SESSIONS SET STATUS=%s, UPDATED_AT=CURRENT_TIMESTAMP() WHERE ID=%s",
-                    ("failed", session_id),
-                )
-            finally:
-                cur.close()
+            cur.execute(
+                "UPDATE SESSIONS SET STATUS=%s, UPDATED_AT=CURRENT_TIMESTAMP() WHERE ID=%s",
+                ("failed", session_id),
+            )
         finally:
-            conn.close()
+            cur.close()
 
 def save_analysis_results(session_id: int, analysis_response: AnalysisResponse):
     """Save analysis results to database"""
     try:
-        # Convert results to JSON strings for storage
-        personas_json = json.dumps([persona.dict() for persona in analysis_response.analysis_results.personas])
-        opinions_json = json.dumps([opinion.dict() for opinion in analysis_response.analysis_results.opinions])
-        sentiment_json = json.dumps(analysis_response.analysis_results.sentiment_breakdown.dict())
-        
-        import snowflake.connector
-        from config.settings import settings
-        conn = snowflake.connector.connect(
-            account=settings.snowflake_account,
-            user=settings.snowflake_user,
-            password=settings.snowflake_password,
-            warehouse=settings.snowflake_warehouse,
-            database=settings.snowflake_database,
-            schema=settings.snowflake_schema,
-        )
-        try:
+        # Convert results to JSON strings for storage (TEXT columns)
+        results = analysis_response.analysis_results
+        personas_json = PERSONAS_ADAPTER.dump_json(results.personas).decode()
+        opinions_json = OPINIONS_ADAPTER.dump_json(results.opinions).decode()
+        sentiment_json = results.sentiment_breakdown.model_dump_json()
+        
+        with snowflake_connection() as conn:
+            # Insert the results and complete the session in one transaction,
+            # submitted as a single multi-statement request
             cur = conn.cursor()
             try:
                 cur.execute(
                     """
+                    BEGIN;
                     INSERT INTO ANALYSIS_RESULTS (
                         SESSION_ID, PERSONAS, OPINIONS, SUMMARY, SENTIMENT_BREAKDOWN,
                         MARKET_POTENTIAL, CONFIDENCE_SCORE, CREATED_AT
-                    ) VALUES (%s, %s, %s, %s, %s, %s, %s, CURRENT_TIMESTAMP())
+                    ) VALUES (%s, %s, %s, %s, %s, %s, %s, CURRENT_TIMESTAMP());
+                    UPDATE SESSIONS SET STATUS=%s, UPDATED_AT=CURRENT_TIMESTAMP() WHERE ID=%s;
+                    COMMIT;
                     """,
                     (
                         session_id,
@@ -132,55 +122,52 @@ def save_analysis_results(session_id: int, analysis_response: AnalysisResponse):
                         sentiment_json,
                         analysis_response.analysis_results.market_potential,
                         analysis_response.metadata.get("confidence_score", 0),
+                        "completed",
+                        session_id,
                     ),
+                    num_statements=4,
                 )
-                cur.execute(
-                    "UPDATE SESSIONS SET STATUS=%s, UPDATED_AT=CURRENT_TIMESTAMP() WHERE ID=%s",
-                    ("completed", session_id),
-                )
+            except Exception:
+                conn.rollback()
+                raise
             finally:
                 cur.close()
-        finally:
-            conn.close()
         
     except Exception as e:
-        print(f"Error saving analysis results: {e}")
-        db.rollback()
+        logger.error("Error saving analysis results: %s", e)
+        raise
 
 @router.get("/analysis/{analysis_id}", response_model=AnalysisResponse)
-async def get_analysis_results(analysis_id: int, conn = Depends(get_snowflake_connection)):
+def get_analysis_results(analysis_id: int, conn = Depends(get_snowflake_connection)):
     """
     Get analysis results by ID
     """
     try:
-        # Get session
-        cur = conn.cursor()
-        try:
-            cur.execute("SELECT ID, PRODUCT_IDEA, STATUS FROM SESSIONS WHERE ID=%s", (analysis_id,))
-            row = cur.fetchone()
-        finally:
-            cur.close()
-        if not row:
-            raise HTTPException(status_code=404, detail="Session not found")
-        session_product_idea = row[1]
-        session_status = row[2]
-        
-        # Get analysis results
+        # Get session and its latest analysis results in one round trip
         cur = conn.cursor()
         try:
             cur.execute(
                 """
-                SELECT PERSONAS, OPINIONS, SUMMARY, SENTIMENT_BREAKDOWN, MARKET_POTENTIAL,
-                       CONFIDENCE_SCORE, CREATED_AT
-                FROM ANALYSIS_RESULTS WHERE SESSION_ID=%s ORDER BY CREATED_AT DESC LIMIT 1
+                SELECT s.PRODUCT_IDEA, s.STATUS,
+                       r.PERSONAS, r.OPINIONS, r.SUMMARY, r.SENTIMENT_BREAKDOWN, r.MARKET_POTENTIAL,
+                       r.CONFIDENCE_SCORE, r.CREATED_AT, r.SESSION_ID
+                FROM SESSIONS s
+                LEFT JOIN ANALYSIS_RESULTS r ON r.SESSION_ID = s.ID
+                WHERE s.ID=%s
+                ORDER BY r.CREATED_AT DESC NULLS LAST LIMIT 1
                 """,
                 (analysis_id,),
             )
-            res = cur.fetchone()
+            row = cur.fetchone()
         finally:
             cur.close()
+        if not row:
+            raise HTTPException(status_code=404, detail="Session not found")
+        session_product_idea = row[0]
+        session_status = row[1]
+        res = row[2:9]
         
-        if not res:
+        if row[9] is None:
             return AnalysisResponse(
                 session_id=analysis_id,
                 product_idea=session_product_idea,
@@ -189,23 +176,16 @@ async def get_analysis_results(analysis_id: int, conn = Depends(get_snowflake_co
                 status=session_status
             )
         
-        # Parse JSON data
-        personas = json.loads(res[0]) if res[0] else []
-        opinions = json.loads(res[1]) if res[1] else []
-        sentiment_breakdown = json.loads(res[3]) if res[3] else {}
-        
-        # Create response
-        from models.schemas import AnalysisResults, Persona, Opinion, SentimentBreakdown
-        
-        analysis_results = AnalysisResults(
-            personas=[Persona(**p) for p in personas],
-            opinions=[Opinion(**o) for o in opinions],
-            summary=res[2] or "",
-            sentiment_breakdown=SentimentBreakdown(**sentiment_breakdown),
-            market_potential=res[4] or "unknown",
-            key_insights=[],  # Could be stored separately if needed
-            recommendations=[]  # Could be stored separately if needed
-        )
+        # Validate the stored JSON columns directly, without an intermediate parse
+        analysis_results = AnalysisResults.model_validate({
+            "personas": PERSONAS_ADAPTER.validate_json(res[0]) if res[0] else [],
+            "opinions": OPINIONS_ADAPTER.validate_json(res[1]) if res[1] else [],
+            "summary": res[2] or "",
+            "sentiment_breakdown": SentimentBreakdown.model_validate_json(res[3]) if res[3] else {},
+            "market_potential": res[4] or "unknown",
+            "key_insights": [],  # Could be stored separately if needed
+            "recommendations": []  # Could be stored separately if needed
+        })
         
         return AnalysisResponse(
             session_id=analysis_id,
@@ -222,30 +202,23 @@ async def get_analysis_results(analysis_id: int, conn = Depends(get_snowflake_co
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/rank", response_model=IdeaAnalyzeResponse)
-async def rank_product_idea(
-    request: IdeaAnalyzeRequest,
-    conn = Depends(get_snowflake_connection)
-):
+async def rank_product_idea(request: IdeaAnalyzeRequest):
     """
     Rank and evaluate a product idea with structured scoring using predefined personas
     """
     try:
-        print(f"Starting ranking for idea: {request.idea}")
-        
-        # Import personas data
-        from data.personas import get_random_personas
-        print("Successfully imported personas module")
+        logger.debug("Starting ranking for idea: %s", request.idea)
         
         # Get random personas for evaluation
         personas = get_random_personas(request.max_personas)
-        print(f"Got {len(personas)} personas for evaluation")
+        logger.debug("Got %d personas for evaluation", len(personas))
         
         # Call OpenAI for ranking analysis with specific personas
         ranking_results = await analysis_service.openai_service.rank_product_idea(
             request.idea, 
             personas
         )
-        print("OpenAI ranking completed successfully")
+        logger.debug("OpenAI ranking completed")
         
         # Create response using the ranking schemas
         response = IdeaAnalyzeResponse(
@@ -257,7 +230,5 @@ async def rank_product_idea(
         return response
         
     except Exception as e:
-        print(f"Error in rank_product_idea: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error in rank_product_idea: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
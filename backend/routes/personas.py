@@ -0,0 +1,31 @@
+from fastapi import APIRouter, Header, Response
+from typing import Optional
+from data.personas import get_all_personas
+import hashlib
+import orjson
+
+router = APIRouter()
+
+# The persona data is static, so the listing is encoded once at import and
+# revalidated by ETag instead of being rebuilt per request. The tag is weak
+# because GZipMiddleware serves the same tag on compressed and identity bodies
+PERSONAS_BODY = orjson.dumps(get_all_personas())
+PERSONAS_ETAG = f'W/"{hashlib.blake2b(PERSONAS_BODY, digest_size=16).hexdigest()}"'
+
+def _etag_matches(if_none_match: str) -> bool:
+    """Weakly compare an If-None-Match list against the personas ETag"""
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.removeprefix("W/") == PERSONAS_ETAG.removeprefix("W/"):
+            return True
+    return False
+
+@router.get("/personas")
+async def get_personas(if_none_match: Optional[str] = Header(None)):
+    """
+    Get every predefined persona
+    """
+    headers = {"ETag": PERSONAS_ETAG}
+    if if_none_match and _etag_matches(if_none_match):
+        return Response(status_code=304, headers=headers)
+    return Response(content=PERSONAS_BODY, media_type="application/json", headers=headers)
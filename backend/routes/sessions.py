@@ -1,61 +1,106 @@
-from fastapi import APIRouter, Depends, HTTPException
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from typing import Dict, List, Optional, Tuple
 from models.schemas import SessionCreate, SessionResponse
-from config.snowflake import get_snowflake_connection
+from config.settings import settings
+from config.snowflake import get_snowflake_connection, snowflake_connection
+import orjson
+import threading
+import time
 
 router = APIRouter()
 
+# SQL for the session routes, kept as module constants so every request
+# reuses the same statement text
+SESSION_COLUMNS = "ID, PRODUCT_IDEA, STATUS, CREATED_AT, UPDATED_AT"
+LIST_SESSIONS_SQL = f"SELECT {SESSION_COLUMNS} FROM SESSIONS WHERE (%s IS NULL OR ID < %s) ORDER BY ID DESC LIMIT %s"
+GET_SESSION_SQL = f"SELECT {SESSION_COLUMNS} FROM SESSIONS WHERE ID=%s"
+CREATE_SESSION_SQL = f"""
+SET NEW_SESSION_ID = (SELECT SESSIONS_ID_SEQ.NEXTVAL);
+INSERT INTO SESSIONS (ID, PRODUCT_IDEA, STATUS, CREATED_AT, UPDATED_AT) VALUES ($NEW_SESSION_ID, %s, %s, CURRENT_TIMESTAMP(), CURRENT_TIMESTAMP());
+SELECT {SESSION_COLUMNS} FROM SESSIONS WHERE ID=$NEW_SESSION_ID;
+"""
+DELETE_SESSION_SQL = "DELETE FROM SESSIONS WHERE ID=%s"
+
+# Short-lived cache of encoded GET /sessions bodies, keyed by (limit, before_id),
+# for UIs that poll the listing. Creating or deleting a session clears it;
+# status changes show up once the TTL expires.
+_sessions_cache: Dict[Tuple[int, Optional[int]], Tuple[float, bytes]] = {}
+# Bound on cached listings; before_id is client-chosen, so keys are unbounded
+SESSIONS_CACHE_MAX_ENTRIES = 32
+# Handlers run in the threadpool; writers take the lock, lookups don't need it
+_sessions_cache_lock = threading.Lock()
+
+def invalidate_sessions_cache():
+    """Drop the cached session listings so the next request reloads them"""
+    with _sessions_cache_lock:
+        _sessions_cache.clear()
+
+def _cache_sessions_page(key: Tuple[int, Optional[int]], body: bytes):
+    """Store a listing, evicting expired entries and then the oldest when full"""
+    now = time.monotonic()
+    with _sessions_cache_lock:
+        for stale_key in [k for k, (expires_at, _) in _sessions_cache.items() if expires_at <= now]:
+            del _sessions_cache[stale_key]
+        while len(_sessions_cache) >= SESSIONS_CACHE_MAX_ENTRIES:
+            del _sessions_cache[next(iter(_sessions_cache))]
+        _sessions_cache[key] = (now + settings.sessions_cache_ttl_seconds, body)
+
 @router.get("/sessions", response_model=List[SessionResponse])
-async def get_sessions(conn = Depends(get_snowflake_connection)):
+def get_sessions(limit: int = Query(200, ge=1, le=1000), before_id: Optional[int] = None):
     """
-    Get all analysis sessions
+    Get analysis sessions, newest first. Pass the last id of a page as
+    before_id to get the next one.
     """
+    key = (limit, before_id)
+    cached = _sessions_cache.get(key)
+    if cached is not None and time.monotonic() < cached[0]:
+        return Response(content=cached[1], media_type="application/json")
+
     try:
-        cur = conn.cursor()
-        try:
-            cur.execute("SELECT ID, PRODUCT_IDEA, STATUS, CREATED_AT, UPDATED_AT FROM SESSIONS ORDER BY CREATED_AT DESC")
-            rows = cur.fetchall()
-        finally:
-            cur.close()
-        return [
-            SessionResponse(
-                id=row[0],
-                product_idea=row[1],
-                status=row[2],
-                created_at=row[3],
-                updated_at=row[4],
-            )
+        with snowflake_connection() as conn:
+            cur = conn.cursor()
+            try:
+                # Keyset pagination on the sequence-assigned id, so later pages
+                # don't rescan the rows before them the way OFFSET does
+                cur.execute(LIST_SESSIONS_SQL, (before_id, before_id, limit))
+                rows = cur.fetchall()
+            finally:
+                cur.close()
+        # Rows come straight from the table, so encode them without a model pass
+        body = orjson.dumps([
+            {
+                "id": row[0],
+                "product_idea": row[1],
+                "status": row[2],
+                "created_at": row[3],
+                "updated_at": row[4],
+            }
             for row in rows
-        ]
+        ])
+        _cache_sessions_page(key, body)
+        return Response(content=body, media_type="application/json")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/sessions", response_model=SessionResponse)
-async def create_session(session_data: SessionCreate, conn = Depends(get_snowflake_connection)):
+def create_session(session_data: SessionCreate, conn = Depends(get_snowflake_connection)):
     """
     Create a new analysis session
     """
     try:
+        # Insert under an id drawn from the sequence and read the row back by
+        # primary key, in a single multi-statement request
         cur = conn.cursor()
         try:
-            cur.execute(
-                "INSERT INTO SESSIONS (PRODUCT_IDEA, STATUS, CREATED_AT, UPDATED_AT) VALUES (%s, %s, CURRENT_TIMESTAMP(), CURRENT_TIMESTAMP())",
-                (session_data.product_idea, "created"),
-            )
-        finally:
-            cur.close()
-
-        cur = conn.cursor()
-        try:
-            cur.execute(
-                "SELECT ID, PRODUCT_IDEA, STATUS, CREATED_AT, UPDATED_AT FROM SESSIONS WHERE PRODUCT_IDEA=%s ORDER BY CREATED_AT DESC LIMIT 1",
-                (session_data.product_idea,),
-            )
+            cur.execute(CREATE_SESSION_SQL, (session_data.product_idea, "created"), num_statements=3)
+            cur.nextset()
+            cur.nextset()
             row = cur.fetchone()
             if not row:
                 raise RuntimeError("Failed to retrieve new session after insert")
         finally:
             cur.close()
+        invalidate_sessions_cache()
 
         return SessionResponse(
             id=row[0],
@@ -68,14 +113,14 @@ async def create_session(session_data: SessionCreate, conn = Depends(get_snowfla
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/sessions/{session_id}", response_model=SessionResponse)
-async def get_session(session_id: int, conn = Depends(get_snowflake_connection)):
+def get_session(session_id: int, conn = Depends(get_snowflake_connection)):
     """
     Get a specific analysis session
     """
     try:
         cur = conn.cursor()
         try:
-            cur.execute("SELECT ID, PRODUCT_IDEA, STATUS, CREATED_AT, UPDATED_AT FROM SESSIONS WHERE ID=%s", (session_id,))
+            cur.execute(GET_SESSION_SQL, (session_id,))
             row = cur.fetchone()
         finally:
             cur.close()
@@ -95,25 +140,21 @@ async def get_session(session_id: int, conn = Depends(get_snowflake_connection))
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.delete("/sessions/{session_id}")
-async def delete_session(session_id: int, conn = Depends(get_snowflake_connection)):
+def delete_session(session_id: int, conn = Depends(get_snowflake_connection)):
     """
     Delete an analysis session
     """
     try:
+        # The affected row count doubles as the existence check
         cur = conn.cursor()
         try:
-            cur.execute("SELECT 1 FROM SESSIONS WHERE ID=%s", (session_id,))
-            exists = cur.fetchone() is not None
+            cur.execute(DELETE_SESSION_SQL, (session_id,))
+            deleted = cur.rowcount
         finally:
             cur.close()
-        if not exists:
+        if not deleted:
             raise HTTPException(status_code=404, detail="Session not found")
-
-        cur = conn.cursor()
-        try:
-            cur.execute("DELETE FROM SESSIONS WHERE ID=%s", (session_id,))
-        finally:
-            cur.close()
+        invalidate_sessions_cache()
         
         return {"message": "Session deleted successfully"}
     except HTTPException:
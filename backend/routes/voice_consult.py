@@ -4,17 +4,34 @@ Handles ElevenLabs voice consultation endpoints for persona-based conversations.
 Uses Snowflake database for storage.
 """
 from fastapi import APIRouter, HTTPException
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple
 from pydantic import BaseModel
-from datetime import datetime
-import json
+import asyncio
+import orjson
+import time
 
-from config.snowflake import get_snowflake_connection
+from config.settings import settings
+from config.snowflake import snowflake_connection
 from services.elevenlabs_service import ElevenLabsService
 
 router = APIRouter()
 elevenlabs_service = ElevenLabsService()
 
+# In-process cache for the GET /voice/agents payload.
+# Agents only change when a new one is created, which clears the cache.
+_agents_cache: Optional[Dict[str, Any]] = None
+_agents_cache_expires_at = 0.0
+
+# Persona id -> (ELEVENLABS_AGENTS.ID, ElevenLabs agent id).
+# PERSONA_ID is unique and agents are never reassigned, so entries never go stale.
+_agent_cache: Dict[str, Tuple[int, str]] = {}
+
+def invalidate_agents_cache():
+    """Drop the cached agents listing so the next request reloads it"""
+    global _agents_cache, _agents_cache_expires_at
+    _agents_cache = None
+    _agents_cache_expires_at = 0.0
+
 # Request/Response Models
 class PersonaData(BaseModel):
     id: str
@@ -54,6 +71,92 @@ class ConsultationDetailsResponse(BaseModel):
     created_at: str
     ended_at: Optional[str]
 
+AGENT_BY_PERSONA_SQL = "SELECT ID, AGENT_ID FROM ELEVENLABS_AGENTS WHERE PERSONA_ID = %(persona_id)s"
+
+# The Snowflake work below is blocking, so the async handlers run it in a
+# worker thread and never hold a pooled connection across an ElevenLabs call
+def _find_agent(persona_id: str) -> Optional[Tuple[int, str]]:
+    """Look up the stored agent for a persona, in process first and then in the database"""
+    existing_agent = _agent_cache.get(persona_id)
+    if existing_agent is not None:
+        return existing_agent
+    with snowflake_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(AGENT_BY_PERSONA_SQL, {'persona_id': persona_id})
+            row = cursor.fetchone()
+        finally:
+            cursor.close()
+    if row:
+        return _agent_cache.setdefault(persona_id, (row[0], row[1]))
+    return None
+
+def _store_agent(persona: PersonaData, agent_data: Dict[str, Any]) -> Tuple[int, str]:
+    """Store a newly created agent and return its (table id, agent id)"""
+    with snowflake_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute("""
+                INSERT INTO ELEVENLABS_AGENTS 
+                (PERSONA_ID, AGENT_ID, PERSONA_NAME, PERSONA_TITLE, 
+                 PERSONA_LOCATION, PERSONA_INDUSTRY, SYSTEM_PROMPT)
+                VALUES (%(persona_id)s, %(agent_id)s, %(persona_name)s, %(persona_title)s, 
+                        %(persona_location)s, %(persona_industry)s, %(system_prompt)s)
+            """, {
+                'persona_id': persona.id,
+                'agent_id': agent_data["agent_id"],
+                'persona_name': persona.name,
+                'persona_title': persona.title,
+                'persona_location': persona.location,
+                'persona_industry': persona.industry,
+                'system_prompt': agent_data["system_prompt"]
+            })
+            invalidate_agents_cache()
+            
+            # Get the newly created agent ID
+            cursor.execute(AGENT_BY_PERSONA_SQL, {'persona_id': persona.id})
+            result = cursor.fetchone()
+            conn.commit()
+        finally:
+            cursor.close()
+    return _agent_cache.setdefault(persona.id, (result[0], result[1]))
+
+def _create_consultation(request: StartConsultationRequest, agent_table_id: int) -> int:
+    """Insert an active consultation record and return its id"""
+    with snowflake_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute("""
+                INSERT INTO VOICE_CONSULTATIONS 
+                (SESSION_ID, AGENT_TABLE_ID, PERSONA_ID, STARTUP_IDEA, STATUS)
+                VALUES (%(session_id)s, %(agent_table_id)s, %(persona_id)s, %(startup_idea)s, %(status)s)
+            """, {
+                'session_id': request.session_id,
+                'agent_table_id': agent_table_id,
+                'persona_id': request.persona.id,
+                'startup_idea': request.startup_idea,
+                'status': 'active'
+            })
+            
+            # Get the last inserted consultation ID
+            # In Snowflake, we query the table we just inserted into
+            cursor.execute("""
+                SELECT ID FROM VOICE_CONSULTATIONS 
+                WHERE AGENT_TABLE_ID = %(agent_table_id)s 
+                AND PERSONA_ID = %(persona_id)s 
+                ORDER BY CREATED_AT DESC 
+                LIMIT 1
+            """, {
+                'agent_table_id': agent_table_id,
+                'persona_id': request.persona.id
+            })
+            consultation_id = cursor.fetchone()[0]
+            
+            conn.commit()
+            return consultation_id
+        finally:
+            cursor.close()
+
 @router.post("/voice/start-consultation", response_model=StartConsultationResponse)
 async def start_voice_consultation(request: StartConsultationRequest):
     """
@@ -64,113 +167,55 @@ async def start_voice_consultation(request: StartConsultationRequest):
         persona_dict = request.persona.dict()
         
         # Check if we already have an agent for this persona
-        for conn in get_snowflake_connection():
-            cursor = conn.cursor()
-            try:
-                # Check for existing agent
-                cursor.execute(
-                    "SELECT ID, AGENT_ID FROM ELEVENLABS_AGENTS WHERE PERSONA_ID = %(persona_id)s",
-                    {'persona_id': request.persona.id}
-                )
-                existing_agent = cursor.fetchone()
-                
-                if existing_agent:
-                    # Use existing agent
-                    agent_table_id, agent_id = existing_agent
-                    print(f"Using existing agent {agent_id} for persona {request.persona.id}")
-                else:
-                    # Create new agent
-                    print(f"Creating new agent for persona {request.persona.id}")
-                    
-                    # Convert previous_analysis to dict if it exists
-                    analysis_dict = None
-                    if request.previous_analysis:
-                        analysis_dict = {
-                            'rating': request.previous_analysis.rating,
-                            'sentiment': request.previous_analysis.sentiment,
-                            'key_insight': request.previous_analysis.key_insight
-                        }
-                    
-                    agent_data = await elevenlabs_service.create_agent_for_persona(
-                        persona_dict,
-                        request.startup_idea,
-                        analysis_dict
-                    )
-                    
-                    # Store agent in database
-                    cursor.execute("""
-                        INSERT INTO ELEVENLABS_AGENTS 
-                        (PERSONA_ID, AGENT_ID, PERSONA_NAME, PERSONA_TITLE, 
-                         PERSONA_LOCATION, PERSONA_INDUSTRY, SYSTEM_PROMPT)
-                        VALUES (%(persona_id)s, %(agent_id)s, %(persona_name)s, %(persona_title)s, 
-                                %(persona_location)s, %(persona_industry)s, %(system_prompt)s)
-                    """, {
-                        'persona_id': request.persona.id,
-                        'agent_id': agent_data["agent_id"],
-                        'persona_name': request.persona.name,
-                        'persona_title': request.persona.title,
-                        'persona_location': request.persona.location,
-                        'persona_industry': request.persona.industry,
-                        'system_prompt': agent_data["system_prompt"]
-                    })
-                    
-                    # Get the newly created agent ID
-                    cursor.execute(
-                        "SELECT ID, AGENT_ID FROM ELEVENLABS_AGENTS WHERE PERSONA_ID = %(persona_id)s",
-                        {'persona_id': request.persona.id}
-                    )
-                    result = cursor.fetchone()
-                    agent_table_id, agent_id = result
-                
-                # Create consultation record and get the ID
-                cursor.execute("""
-                    INSERT INTO VOICE_CONSULTATIONS 
-                    (SESSION_ID, AGENT_TABLE_ID, PERSONA_ID, STARTUP_IDEA, STATUS)
-                    VALUES (%(session_id)s, %(agent_table_id)s, %(persona_id)s, %(startup_idea)s, %(status)s)
-                """, {
-                    'session_id': request.session_id,
-                    'agent_table_id': agent_table_id,
-                    'persona_id': request.persona.id,
-                    'startup_idea': request.startup_idea,
-                    'status': 'active'
-                })
-                
-                # Get the last inserted consultation ID
-                # In Snowflake, we query the table we just inserted into
-                cursor.execute("""
-                    SELECT ID FROM VOICE_CONSULTATIONS 
-                    WHERE AGENT_TABLE_ID = %(agent_table_id)s 
-                    AND PERSONA_ID = %(persona_id)s 
-                    ORDER BY CREATED_AT DESC 
-                    LIMIT 1
-                """, {
-                    'agent_table_id': agent_table_id,
-                    'persona_id': request.persona.id
-                })
-                consultation_id = cursor.fetchone()[0]
-                
-                conn.commit()
-                
-                return StartConsultationResponse(
-                    consultation_id=consultation_id,
-                    agent_id=agent_id,
-                    persona_name=request.persona.name,
-                    message=f"Voice consultation with {request.persona.name} is ready!"
-                )
-            finally:
-                cursor.close()
+        existing_agent = await asyncio.to_thread(_find_agent, request.persona.id)
+        
+        if existing_agent:
+            # Use existing agent
+            agent_table_id, agent_id = existing_agent
+            print(f"Using existing agent {agent_id} for persona {request.persona.id}")
+        else:
+            # Create new agent
+            print(f"Creating new agent for persona {request.persona.id}")
+            
+            # Convert previous_analysis to dict if it exists
+            analysis_dict = None
+            if request.previous_analysis:
+                analysis_dict = {
+                    'rating': request.previous_analysis.rating,
+                    'sentiment': request.previous_analysis.sentiment,
+                    'key_insight': request.previous_analysis.key_insight
+                }
+            
+            agent_data = await elevenlabs_service.create_agent_for_persona(
+                persona_dict,
+                request.startup_idea,
+                analysis_dict
+            )
+            
+            # Store agent in database
+            agent_table_id, agent_id = await asyncio.to_thread(_store_agent, request.persona, agent_data)
+        
+        # Create consultation record and get the ID
+        consultation_id = await asyncio.to_thread(_create_consultation, request, agent_table_id)
+        
+        return StartConsultationResponse(
+            consultation_id=consultation_id,
+            agent_id=agent_id,
+            persona_name=request.persona.name,
+            message=f"Voice consultation with {request.persona.name} is ready!"
+        )
                 
     except Exception as e:
         print(f"Error starting consultation: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/voice/consultation/{consultation_id}", response_model=ConsultationDetailsResponse)
-async def get_consultation_details(consultation_id: int):
+def get_consultation_details(consultation_id: int):
     """
     Get details of a voice consultation including transcript if available
     """
     try:
-        for conn in get_snowflake_connection():
+        with snowflake_connection() as conn:
             cursor = conn.cursor()
             try:
                 cursor.execute("""
@@ -212,6 +257,36 @@ async def get_consultation_details(consultation_id: int):
         print(f"Error fetching consultation details: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+def _mark_consultation_complete(
+    consultation_id: int,
+    conversation_id: Optional[str],
+    transcript: Optional[str],
+    duration: Optional[float]
+):
+    """Mark a consultation completed, storing its transcript and duration"""
+    with snowflake_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute("""
+                UPDATE VOICE_CONSULTATIONS
+                SET STATUS = %(status)s,
+                    ENDED_AT = CURRENT_TIMESTAMP(),
+                    CONVERSATION_ID = %(conversation_id)s,
+                    TRANSCRIPT = %(transcript)s,
+                    DURATION_SECONDS = %(duration)s
+                WHERE ID = %(consultation_id)s
+            """, {
+                'status': 'completed',
+                'conversation_id': conversation_id,
+                'transcript': transcript,
+                'duration': duration,
+                'consultation_id': consultation_id
+            })
+            
+            conn.commit()
+        finally:
+            cursor.close()
+
 @router.post("/voice/consultation/{consultation_id}/complete")
 async def complete_consultation(
     consultation_id: int,
@@ -234,7 +309,7 @@ async def complete_consultation(
                     transcript_data = conversation_details["transcript"]
                     # If it's a list, convert to JSON string
                     if isinstance(transcript_data, list):
-                        transcript = json.dumps(transcript_data)
+                        transcript = orjson.dumps(transcript_data).decode()
                     else:
                         transcript = str(transcript_data)
                 
@@ -246,42 +321,20 @@ async def complete_consultation(
                 print(f"Error fetching conversation details: {e}")
         
         # Update consultation in database
-        for conn in get_snowflake_connection():
-            cursor = conn.cursor()
-            try:
-                cursor.execute("""
-                    UPDATE VOICE_CONSULTATIONS
-                    SET STATUS = %(status)s,
-                        ENDED_AT = %(ended_at)s,
-                        CONVERSATION_ID = %(conversation_id)s,
-                        TRANSCRIPT = %(transcript)s,
-                        DURATION_SECONDS = %(duration)s
-                    WHERE ID = %(consultation_id)s
-                """, {
-                    'status': 'completed',
-                    'ended_at': datetime.now(),
-                    'conversation_id': conversation_id,
-                    'transcript': transcript,
-                    'duration': duration,
-                    'consultation_id': consultation_id
-                })
-                
-                conn.commit()
-                
-                return {
-                    "status": "success",
-                    "message": "Consultation marked as complete",
-                    "consultation_id": consultation_id
-                }
-            finally:
-                cursor.close()
+        await asyncio.to_thread(_mark_consultation_complete, consultation_id, conversation_id, transcript, duration)
+        
+        return {
+            "status": "success",
+            "message": "Consultation marked as complete",
+            "consultation_id": consultation_id
+        }
         
     except Exception as e:
         print(f"Error completing consultation: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/voice/consultations")
-async def list_consultations(
+def list_consultations(
     session_id: Optional[int] = None,
     persona_id: Optional[str] = None
 ):
@@ -289,7 +342,7 @@ async def list_consultations(
     List all voice consultations, optionally filtered by session or persona
     """
     try:
-        for conn in get_snowflake_connection():
+        with snowflake_connection() as conn:
             cursor = conn.cursor()
             try:
                 query = """
@@ -346,12 +399,16 @@ async def list_consultations(
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/voice/agents")
-async def list_agents():
+def list_agents():
     """
     List all created ElevenLabs agents
     """
+    global _agents_cache, _agents_cache_expires_at
+    if _agents_cache is not None and time.monotonic() < _agents_cache_expires_at:
+        return _agents_cache
+
     try:
-        for conn in get_snowflake_connection():
+        with snowflake_connection() as conn:
             cursor = conn.cursor()
             try:
                 cursor.execute("""
@@ -383,10 +440,12 @@ async def list_agents():
                         "created_at": row[7].isoformat() if row[7] else ""
                     })
                 
-                return {
+                _agents_cache = {
                     "agents": agents,
                     "total": len(agents)
                 }
+                _agents_cache_expires_at = time.monotonic() + settings.agents_cache_ttl_seconds
+                return _agents_cache
             finally:
                 cursor.close()
                 
@@ -1,9 +1,12 @@
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
-from services.realtime_service import RealtimeService
-import json
+from services.realtime_service import realtime_service
+import asyncio
+import logging
+import orjson
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
-realtime_service = RealtimeService()
 
 @router.websocket("/ws/{session_id}")
 async def websocket_endpoint(websocket: WebSocket, session_id: int):
@@ -12,30 +15,39 @@ async def websocket_endpoint(websocket: WebSocket, session_id: int):
     """
     await realtime_service.connect(websocket, session_id)
     
+    # Outgoing messages go through the connection's queue and are sent by a
+    # dedicated writer task; this coroutine only reads
+    writer = asyncio.create_task(realtime_service.run_writer(websocket, session_id))
+    
     try:
         while True:
-            # Keep connection alive and handle incoming messages
-            data = await websocket.receive_text()
-            message = json.loads(data)
+            # Keep connection alive and handle incoming messages; orjson
+            # decodes bytes and text frames directly
+            frame = await websocket.receive()
+            if frame["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(frame.get("code", 1000))
+            message = orjson.loads(frame.get("bytes") or frame.get("text") or "{}")
             
             # Handle different message types
             if message.get("type") == "ping":
-                await websocket.send_text(json.dumps({
+                await realtime_service.send_to_connection(websocket, session_id, {
                     "type": "pong",
                     "session_id": session_id,
                     "timestamp": message.get("timestamp")
-                }))
+                })
             elif message.get("type") == "get_status":
                 # Send current status (could be enhanced to get from database)
-                await websocket.send_text(json.dumps({
+                await realtime_service.send_to_connection(websocket, session_id, {
                     "type": "status",
                     "session_id": session_id,
                     "status": "connected",
                     "active_connections": realtime_service.get_session_connections_count(session_id)
-                }))
+                })
                 
     except WebSocketDisconnect:
-        realtime_service.disconnect(websocket, session_id)
+        pass
     except Exception as e:
-        print(f"WebSocket error: {e}")
+        logger.warning("WebSocket error: %s", e)
+    finally:
         realtime_service.disconnect(websocket, session_id)
+        writer.cancel()
@@ -1,19 +1,21 @@
 from typing import Dict, Any
 import json
-from datetime import datetime
+import time
+from datetime import datetime, timezone
 from services.openai_service import OpenAIService
-from services.realtime_service import RealtimeService
-from models.schemas import AnalysisResponse, AnalysisResults, Persona, Opinion, SentimentBreakdown
+from services.realtime_service import realtime_service
+from models.schemas import AnalysisResponse, AnalysisResults
 
 class AnalysisService:
     def __init__(self):
         self.openai_service = OpenAIService()
-        self.realtime_service = RealtimeService()
+        self.realtime_service = realtime_service
     
     async def run_analysis(self, product_idea: str, session_id: int) -> AnalysisResponse:
         """
         Run complete analysis pipeline
         """
+        started_ns = time.monotonic_ns()
         try:
             # Send initial status update
             await self.realtime_service.broadcast_status(session_id, "processing", 10)
@@ -27,8 +29,23 @@ class AnalysisService:
             # Send progress update
             await self.realtime_service.broadcast_status(session_id, "processing", 30)
             
-            # Call OpenAI for analysis
-            ai_results = await self.openai_service.analyze_product_idea(product_idea)
+            # Call OpenAI for analysis, streaming text and each parsed opinion to the
+            # session as they are generated, with a running sentiment breakdown
+            sentiment_breakdown = {"positive": 0, "negative": 0, "neutral": 0, "total": 0}
+            
+            async def on_chunk(delta: str):
+                await self.realtime_service.broadcast_chunk(session_id, delta)
+            
+            async def on_opinion(opinion: Dict[str, Any]):
+                sentiment_breakdown[opinion["sentiment"]] += 1
+                sentiment_breakdown["total"] += 1
+                await self.realtime_service.broadcast_opinion(session_id, opinion, sentiment_breakdown)
+            
+            ai_results = await self.openai_service.analyze_product_idea(
+                product_idea,
+                on_chunk=on_chunk,
+                on_opinion=on_opinion
+            )
             
             # Send progress update
             await self.realtime_service.broadcast_status(session_id, "processing", 70)
@@ -40,13 +57,14 @@ class AnalysisService:
             await self.realtime_service.broadcast_status(session_id, "processing", 90)
             
             # Create final response
+            elapsed_ms = (time.monotonic_ns() - started_ns) // 1_000_000
             analysis_response = AnalysisResponse(
                 session_id=session_id,
                 product_idea=product_idea,
                 analysis_results=formatted_results,
                 metadata={
-                    "processed_at": datetime.now().isoformat(),
-                    "processing_time": "45 seconds",
+                    "processed_at": datetime.now(timezone.utc).isoformat(),
+                    "processing_time": f"{elapsed_ms / 1000:.1f} seconds",
                     "confidence_score": self._calculate_confidence_score(ai_results),
                     "data_quality": self._assess_data_quality(ai_results)
                 },
@@ -54,7 +72,7 @@ class AnalysisService:
             )
             
             # Send completion update
-            await self.realtime_service.broadcast_results(session_id, analysis_response.dict())
+            await self.realtime_service.broadcast_results(session_id, analysis_response)
             
             return analysis_response
             
@@ -78,29 +96,16 @@ class AnalysisService:
     
     def _format_analysis_results(self, ai_results: Dict[str, Any]) -> AnalysisResults:
         """Format AI results into structured response"""
-        # Convert personas
-        personas = []
-        for persona_data in ai_results.get("personas", []):
-            personas.append(Persona(**persona_data))
-        
-        # Convert opinions
-        opinions = []
-        for opinion_data in ai_results.get("opinions", []):
-            opinions.append(Opinion(**opinion_data))
-        
-        # Convert sentiment breakdown
-        sentiment_data = ai_results.get("sentiment_breakdown", {})
-        sentiment_breakdown = SentimentBreakdown(**sentiment_data)
-        
-        return AnalysisResults(
-            personas=personas,
-            opinions=opinions,
-            summary=ai_results.get("summary", ""),
-            sentiment_breakdown=sentiment_breakdown,
-            market_potential=ai_results.get("market_potential", "unknown"),
-            key_insights=ai_results.get("key_insights", []),
-            recommendations=ai_results.get("recommendations", [])
-        )
+        # Validate the whole tree in one call instead of building each nested model separately
+        return AnalysisResults.model_validate({
+            "personas": ai_results.get("personas", []),
+            "opinions": ai_results.get("opinions", []),
+            "summary": ai_results.get("summary", ""),
+            "sentiment_breakdown": ai_results.get("sentiment_breakdown", {}),
+            "market_potential": ai_results.get("market_potential", "unknown"),
+            "key_insights": ai_results.get("key_insights", []),
+            "recommendations": ai_results.get("recommendations", [])
+        })
     
     def _calculate_confidence_score(self, ai_results: Dict[str, Any]) -> int:
         """Calculate confidence score for analysis"""
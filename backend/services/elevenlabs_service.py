@@ -3,9 +3,63 @@ ElevenLabs Service for managing conversational AI agents.
 Handles agent creation, configuration, and conversation management.
 """
 import httpx
-import json
+import logging
+import orjson
 from typing import Dict, Any, Optional
+from functools import lru_cache
 from config.settings import settings
+from services.http_client import http_client
+
+logger = logging.getLogger(__name__)
+
+PREVIOUS_ANALYSIS_HEADER = "\n\nYOUR PREVIOUS ANALYSIS:\nYou already provided initial feedback on this idea:\n"
+
+PREVIOUS_ANALYSIS_INSTRUCTIONS = "\nIMPORTANT: Build upon this initial analysis in your conversation. Reference your previous feedback naturally and dive deeper into the points you raised. The entrepreneur has already seen your written analysis and wants to discuss it further.\n"
+
+CONVERSATION_STYLE_PROMPT = """
+CONVERSATION STYLE:
+- Be conversational and approachable, like speaking with a knowledgeable friend
+- Ask clarifying questions to better understand their business
+- Provide specific, actionable feedback based on your expertise
+- Share relevant examples from your experience
+- Be honest about potential challenges while remaining encouraging
+- Keep responses concise (2-3 sentences typically) to maintain natural conversation flow
+
+Remember: You're having a real-time voice conversation. Be natural, authentic, and speak as yourself."""
+
+@lru_cache(maxsize=128)
+def _persona_prompt_block(
+    name: str,
+    title: str,
+    location: str,
+    bio: str,
+    expertise: tuple,
+    experience: str,
+    industry: str,
+    insights: tuple
+) -> str:
+    """
+    Persona part of the agent system prompt. Keyed on the persona's content
+    (not just its id) since personas arrive in the request body.
+    """
+    parts = [f"""You are {name}, a {title} based in {location}.
+
+BACKGROUND:
+{bio}
+
+EXPERTISE:
+You specialize in: {', '.join(expertise)}
+
+YOUR ROLE:
+You are conducting a voice consultation to provide expert feedback and insights on startup ideas and business strategies. Draw upon your {experience} of experience in {industry}.
+
+KEY INSIGHTS YOU'VE OBSERVED:
+"""]
+    
+    # Add persona insights if available
+    parts.extend(f"- {insight}\n" for insight in insights)
+    
+    return "".join(parts)
 
 class ElevenLabsService:
     """Service to manage ElevenLabs AI agents for persona-based voice consultations"""
@@ -27,53 +81,36 @@ class ElevenLabsService:
         """
         Create a detailed system prompt for the agent based on persona information
         """
-        prompt = f"""You are {persona['name']}, a {persona['title']} based in {persona['location']}.
-
-BACKGROUND:
-{persona['bio']}
-
-EXPERTISE:
-You specialize in: {', '.join(persona['expertise'])}
-
-YOUR ROLE:
-You are conducting a voice consultation to provide expert feedback and insights on startup ideas and business strategies. Draw upon your {persona['experience']} of experience in {persona['industry']}.
-
-KEY INSIGHTS YOU'VE OBSERVED:
-"""
-        
-        # Add persona insights if available
-        if 'insights' in persona and persona['insights']:
-            for insight in persona['insights']:
-                prompt += f"- {insight}\n"
+        parts = [_persona_prompt_block(
+            persona['name'],
+            persona['title'],
+            persona['location'],
+            persona['bio'],
+            tuple(persona['expertise']),
+            persona['experience'],
+            persona['industry'],
+            tuple(persona.get('insights') or ())
+        )]
+        append = parts.append
         
         # Add startup context if provided
         if startup_context:
-            prompt += f"\n\nCONTEXT FOR THIS CONSULTATION:\nThe entrepreneur is working on: {startup_context}\n"
+            append(f"\n\nCONTEXT FOR THIS CONSULTATION:\nThe entrepreneur is working on: {startup_context}\n")
         
         # Add previous analysis if provided
         if previous_analysis:
-            prompt += f"\n\nYOUR PREVIOUS ANALYSIS:\n"
-            prompt += f"You already provided initial feedback on this idea:\n"
+            append(PREVIOUS_ANALYSIS_HEADER)
             if previous_analysis.get('rating'):
-                prompt += f"- Rating: {previous_analysis['rating']}/10\n"
+                append(f"- Rating: {previous_analysis['rating']}/10\n")
             if previous_analysis.get('sentiment'):
-                prompt += f"- Sentiment: {previous_analysis['sentiment']}\n"
+                append(f"- Sentiment: {previous_analysis['sentiment']}\n")
             if previous_analysis.get('key_insight'):
-                prompt += f"- Key Insight: {previous_analysis['key_insight']}\n"
-            prompt += "\nIMPORTANT: Build upon this initial analysis in your conversation. Reference your previous feedback naturally and dive deeper into the points you raised. The entrepreneur has already seen your written analysis and wants to discuss it further.\n"
+                append(f"- Key Insight: {previous_analysis['key_insight']}\n")
+            append(PREVIOUS_ANALYSIS_INSTRUCTIONS)
         
-        prompt += """
-CONVERSATION STYLE:
-- Be conversational and approachable, like speaking with a knowledgeable friend
-- Ask clarifying questions to better understand their business
-- Provide specific, actionable feedback based on your expertise
-- Share relevant examples from your experience
-- Be honest about potential challenges while remaining encouraging
-- Keep responses concise (2-3 sentences typically) to maintain natural conversation flow
-
-Remember: You're having a real-time voice conversation. Be natural, authentic, and speak as yourself."""
+        append(CONVERSATION_STYLE_PROMPT)
         
-        return prompt
+        return "".join(parts)
     
     async def create_agent_for_persona(
         self,
@@ -117,34 +154,34 @@ Remember: You're having a real-time voice conversation. Be natural, authentic, a
         }
         
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(
-                    f"{self.base_url}/convai/agents/create",
-                    headers=self.headers,
-                    json=agent_config
-                )
-                response.raise_for_status()
-                result = response.json()
-                
-                return {
-                    "agent_id": result["agent_id"],
-                    "persona_id": persona["id"],
-                    "persona_name": persona["name"],
-                    "system_prompt": system_prompt
-                }
+            response = await http_client.post(
+                f"{self.base_url}/convai/agents/create",
+                headers=self.headers,
+                json=agent_config,
+                timeout=30.0
+            )
+            response.raise_for_status()
+            result = response.json()
+            
+            return {
+                "agent_id": result["agent_id"],
+                "persona_id": persona["id"],
+                "persona_name": persona["name"],
+                "system_prompt": system_prompt
+            }
         except httpx.HTTPStatusError as e:
             error_detail = ""
             try:
                 error_detail = e.response.json()
-                print(f"ElevenLabs API Error Response: {json.dumps(error_detail, indent=2)}")
+                logger.warning("ElevenLabs API Error Response: %s", error_detail)
             except:
                 error_detail = e.response.text
-                print(f"ElevenLabs API Error Text: {error_detail}")
-            print(f"Error creating ElevenLabs agent: {e}")
-            print(f"Request payload: {json.dumps(agent_config, indent=2)}")
+                logger.warning("ElevenLabs API Error Text: %s", error_detail)
+            logger.error("Error creating ElevenLabs agent: %s", e)
+            logger.debug("Request payload: %s", agent_config)
             raise Exception(f"Failed to create agent: {str(e)} - {error_detail}")
         except httpx.HTTPError as e:
-            print(f"Error creating ElevenLabs agent: {e}")
+            logger.error("Error creating ElevenLabs agent: %s", e)
             raise Exception(f"Failed to create agent: {str(e)}")
     
     def _select_voice_for_persona(self, persona: Dict[str, Any]) -> str:
@@ -177,15 +214,16 @@ Remember: You're having a real-time voice conversation. Be natural, authentic, a
         Retrieve details and transcript of a completed conversation
         """
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.get(
-                    f"{self.base_url}/convai/conversations/{conversation_id}",
-                    headers=self.headers
-                )
-                response.raise_for_status()
-                return response.json()
+            response = await http_client.get(
+                f"{self.base_url}/convai/conversations/{conversation_id}",
+                headers=self.headers,
+                timeout=30.0
+            )
+            response.raise_for_status()
+            # Transcripts can be long; decode the body with orjson
+            return orjson.loads(response.content)
         except httpx.HTTPError as e:
-            print(f"Error fetching conversation details: {e}")
+            logger.error("Error fetching conversation details: %s", e)
             raise Exception(f"Failed to fetch conversation: {str(e)}")
     
     async def delete_agent(self, agent_id: str) -> bool:
@@ -193,14 +231,14 @@ Remember: You're having a real-time voice conversation. Be natural, authentic, a
         Delete an agent when no longer needed
         """
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.delete(
-                    f"{self.base_url}/convai/agents/{agent_id}",
-                    headers=self.headers
-                )
-                response.raise_for_status()
-                return True
+            response = await http_client.delete(
+                f"{self.base_url}/convai/agents/{agent_id}",
+                headers=self.headers,
+                timeout=30.0
+            )
+            response.raise_for_status()
+            return True
         except httpx.HTTPError as e:
-            print(f"Error deleting agent: {e}")
+            logger.error("Error deleting agent: %s", e)
             return False
 
@@ -0,0 +1,15 @@
+"""
+Shared HTTP client.
+One connection pool for every outbound API call (OpenAI, ElevenLabs), so
+keep-alive connections and TLS sessions are reused across requests.
+"""
+import httpx
+
+http_client = httpx.AsyncClient(
+    timeout=httpx.Timeout(60.0, connect=10.0),
+    limits=httpx.Limits(max_connections=64, max_keepalive_connections=32)
+)
+
+async def close_http_client():
+    """Close the shared pool on application shutdown"""
+    await http_client.aclose()
@@ -1,48 +1,226 @@
 import openai
-from typing import Dict, Any, List
-import json
+from typing import Dict, Any, List, Optional, Tuple, Callable, Awaitable
+import asyncio
+import logging
 import re
+from bisect import bisect_right
+from functools import lru_cache
+from pydantic import ValidationError
 from config.settings import settings
+from data.personas import PERSONA_CARD_FIELDS, get_persona_cards
+from models.schemas import PersonaCard, RankedPersonaOutput, RankingOutput
+from services.http_client import http_client
+from services.stream_parser import AnalysisStreamParser
+
+logger = logging.getLogger(__name__)
+
+# Shared by every OpenAIService so concurrent requests can't exceed the provider's rate limits
+llm_semaphore = asyncio.Semaphore(settings.max_concurrent_llm_calls)
+
+# Outermost {...} block, for models that wrap JSON in prose or code fences
+JSON_OBJECT_PATTERN = re.compile(r"\{.*\}", re.DOTALL)
+
+# System prompts hold every static instruction so each request shares the same
+# leading tokens; only the idea and persona list vary, at the end of the prompt.
+# OpenAI reuses cached prompt prefixes, so keep these byte-identical between calls.
+ANALYSIS_SYSTEM_PROMPT = """You are a market research AI assistant specializing in persona analysis and product validation. Be thorough, realistic, and data-driven in your analysis.
+
+For the product idea you are given, provide a comprehensive market analysis with the following structure:
+
+**PERSONAS (3-5 personas):**
+For each persona, include:
+- Name and age
+- Location and occupation
+- Brief background
+- Their perspective on this product idea
+
+**OPINIONS:**
+For each persona, provide their specific opinion including:
+- What they like about the idea
+- What concerns they have
+- How likely they are to use/purchase it
+- Any suggestions for improvement
+
+**SUMMARY:**
+Provide a 2-3 sentence summary of the overall market reception, key opportunities, and main challenges.
+
+Format your response exactly like this:
+
+Persona 1: [Name], [Age], [Location], [Occupation]
+Background: [Brief description]
+Opinion: [Detailed opinion with specific feedback]
+
+Persona 2: [Name], [Age], [Location], [Occupation]
+Background: [Brief description]
+Opinion: [Detailed opinion with specific feedback]
+
+[Continue for 3-5 personas]
+
+Summary: [Overall market assessment]
+"""
+
+RANKING_SYSTEM_PROMPT = """You are an expert product evaluator specializing in market research and persona analysis. Provide detailed, structured evaluations with numerical ratings and relevance scores. Always respond with a valid JSON object. Use only plain text in string values - no asterisks, dashes, or markdown.
+
+Respond with a single JSON object with exactly this structure:
+
+{
+  "enhanced_idea": "Enhanced version of the original idea with specific details, target market, and value proposition",
+  "evaluations": [
+    {
+      "persona_id": "The persona id from the persona list you are given",
+      "relevance_score": 0.0-1.0,
+      "rating": 1-10,
+      "sentiment": "positive" | "neutral" | "negative",
+      "key_insight": "Most important insight from this persona's perspective",
+      "detailed_analysis": "Comprehensive explanation of why they think it's good/bad, including specific reasoning based on their expertise and experience"
+    }
+  ],
+  "summary": {
+    "average_rating": 0.0-10.0,
+    "overall_sentiment": "positive" | "neutral" | "negative",
+    "top_concerns": ["3-5 main concerns raised"],
+    "top_opportunities": ["3-5 main opportunities identified"]
+  }
+}
+
+Include exactly one evaluation per persona.
+
+IMPORTANT: Do not use asterisks, dashes, or markdown formatting inside string values. Use plain text only.
+"""
+
+# Keyword sentiment for the free-text opinions
+POSITIVE_WORDS = frozenset(["like", "love", "great", "good", "excellent", "amazing", "positive", "promising"])
+NEGATIVE_WORDS = frozenset(["hate", "bad", "terrible", "awful", "dislike", "concern", "worry", "negative"])
+# Longest keywords first so "dislike" is matched as itself rather than as "like"
+SENTIMENT_KEYWORD_PATTERN = re.compile(
+    "|".join(sorted(POSITIVE_WORDS | NEGATIVE_WORDS, key=len, reverse=True)),
+    re.IGNORECASE
+)
+
+# Positive-opinion ratio cut-offs: below 0.4 low, below 0.7 medium, otherwise high
+MARKET_POTENTIAL_THRESHOLDS = (0.4, 0.7)
+MARKET_POTENTIAL_LEVELS = ("low", "medium", "high")
+
+# Fixed report lines, shared by every analysis instead of rebuilt per call
+MARKET_POTENTIAL_RECOMMENDATIONS = {
+    "high": "Strong market reception - consider proceeding with development",
+    "medium": "Mixed reception - consider addressing concerns before launch",
+    "low": "Low market reception - significant product iteration needed",
+}
+FOLLOW_UP_RECOMMENDATIONS = (
+    "Conduct additional user research to validate findings",
+    "Develop targeted marketing strategy based on persona analysis",
+)
+ANALYSIS_COMPLETED_INSIGHT = "Market analysis completed successfully"
+
+# Upper bound on top concerns/opportunities, matching the "3-5" asked of the model
+MAX_SUMMARY_ITEMS = 5
+# Characters ignored when comparing summary points for duplicates
+SUMMARY_ITEM_NOISE_PATTERN = re.compile(r"[^\w\s]")
+
+@lru_cache(maxsize=None)
+def _trusted_persona_card(persona_id: str) -> Optional[PersonaCard]:
+    """
+    Build the PersonaCard for a persona from data/personas.py once.
+    Uses model_construct, which skips validation, so it must only be fed
+    our own static persona data - never request input.
+    """
+    card = get_persona_cards().get(persona_id)
+    if card is None:
+        return None
+    return PersonaCard.model_construct(**card)
+
+def _format_persona_line(persona: Dict[str, Any]) -> str:
+    """One persona entry of the ranking prompt's persona list"""
+    return f"- [{persona['id']}] {persona['name']} ({persona['title']}, {persona['location']}, {persona['industry']}) - Expertise: {', '.join(persona['expertise'])} - Experience: {persona['experience']}"
+
+@lru_cache(maxsize=None)
+def _trusted_persona_line(persona_id: str) -> Optional[str]:
+    """Ranking prompt line for a persona from data/personas.py, built once"""
+    card = get_persona_cards().get(persona_id)
+    if card is None:
+        return None
+    return _format_persona_line(card)
 
 class OpenAIService:
     def __init__(self):
-        self.client = openai.OpenAI(api_key=settings.openai_api_key)
+        # Keep the SDK's own timeout: given a shared http_client, the SDK would
+        # otherwise adopt that client's 60s read timeout, which the long
+        # non-streamed /rank completion can exceed
+        self.client = openai.AsyncOpenAI(
+            api_key=settings.openai_api_key,
+            http_client=http_client,
+            timeout=openai.DEFAULT_TIMEOUT
+        )
     
-    async def analyze_product_idea(self, product_idea: str) -> Dict[str, Any]:
+    async def analyze_product_idea(
+        self,
+        product_idea: str,
+        on_chunk: Optional[Callable[[str], Awaitable[None]]] = None,
+        on_opinion: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None
+    ) -> Dict[str, Any]:
         """
-        Analyze product idea using OpenAI and return structured data
+        Analyze product idea using OpenAI and return structured data.
+        The completion is streamed; each text delta is passed to on_chunk as it arrives,
+        and each opinion to on_opinion as soon as its line is complete.
         """
         try:
             # Create the prompt
             prompt = self._create_analysis_prompt(product_idea)
             
-            # Call OpenAI API
-            response = self.client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a market research AI assistant specializing in persona analysis and product validation. Be thorough, realistic, and data-driven in your analysis."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                max_tokens=1000,
-                temperature=0.7
-            )
+            # Hold a slot for the whole stream; capped to stay under provider rate limits
+            async with llm_semaphore:
+                # Call OpenAI API
+                stream = await self.client.chat.completions.create(
+                    model="gpt-4o-mini",
+                    messages=[
+                        {
+                            "role": "system",
+                            "content": ANALYSIS_SYSTEM_PROMPT
+                        },
+                        {
+                            "role": "user",
+                            "content": prompt
+                        }
+                    ],
+                    max_tokens=1000,
+                    temperature=0.7,
+                    stream=True
+                )
             
-            # Extract the response content
-            raw_response = response.choices[0].message.content
+                # Collect the streamed response content, parsing lines as they complete
+                parts = []
+                opinions = []
+                parser = AnalysisStreamParser()
+                
+                async def add_opinions(texts: List[str]):
+                    for text in texts:
+                        opinion = self._build_opinion(len(opinions), text)
+                        opinions.append(opinion)
+                        if on_opinion:
+                            await on_opinion(opinion)
+                
+                async for chunk in stream:
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta.content
+                    if not delta:
+                        continue
+                    parts.append(delta)
+                    completed = parser.feed(delta)
+                    if on_chunk:
+                        await on_chunk(delta)
+                    await add_opinions(completed)
+                await add_opinions(parser.close())
+                raw_response = "".join(parts)
             
-            # Parse the response into structured data
-            structured_data = self._parse_ai_response(raw_response)
+            # Build structured data from the already-parsed stream
+            structured_data = self._parse_ai_response(raw_response, parser, opinions)
             
             return structured_data
             
         except Exception as e:
-            print(f"OpenAI API error: {e}")
+            logger.error("OpenAI API error: %s", e)
             # Return fallback data for demo purposes
             return self._get_fallback_data(product_idea)
 
@@ -54,92 +232,68 @@ class OpenAIService:
             # Create the ranking prompt with specific personas
             prompt = self._create_ranking_prompt(idea, personas)
             
-            # Call OpenAI API
-            response = self.client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are an expert product evaluator specializing in market research and persona analysis. Provide detailed, structured evaluations with numerical ratings and relevance scores. Use only plain text formatting - no asterisks, dashes, or markdown."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                max_tokens=3000,
-                temperature=0.7
-            )
+            async with llm_semaphore:
+                # Call OpenAI API
+                response = await self.client.chat.completions.create(
+                    model="gpt-4o-mini",
+                    messages=[
+                        {
+                            "role": "system",
+                            "content": RANKING_SYSTEM_PROMPT
+                        },
+                        {
+                            "role": "user",
+                            "content": prompt
+                        }
+                    ],
+                    max_tokens=3000,
+                    temperature=0.7,
+                    response_format={"type": "json_object"}
+                )
             
             # Extract the response content
             raw_response = response.choices[0].message.content
             
             # Parse the response into structured ranking data
-            structured_data = self._parse_ranking_response(raw_response, idea, personas)
-            
-            return structured_data
+            return self._parse_ranking_response(raw_response, idea, personas)
             
         except Exception as e:
-            print(f"OpenAI API error: {e}")
+            logger.error("OpenAI API error: %s", e)
             # Return fallback ranking data
             return self._get_fallback_ranking_data(idea, personas)
     
     def _create_analysis_prompt(self, product_idea: str) -> str:
-        """Create the analysis prompt for OpenAI"""
-        return f"""
-Analyze this product idea: "{product_idea}"
-
-Please provide a comprehensive market analysis with the following structure:
-
-**PERSONAS (3-5 personas):**
-For each persona, include:
-- Name and age
-- Location and occupation
-- Brief background
-- Their perspective on this product idea
-
-**OPINIONS:**
-For each persona, provide their specific opinion including:
-- What they like about the idea
-- What concerns they have
-- How likely they are to use/purchase it
-- Any suggestions for improvement
-
-**SUMMARY:**
-Provide a 2-3 sentence summary of the overall market reception, key opportunities, and main challenges.
-
-Format your response exactly like this:
-
-Persona 1: [Name], [Age], [Location], [Occupation]
-Background: [Brief description]
-Opinion: [Detailed opinion with specific feedback]
-
-Persona 2: [Name], [Age], [Location], [Occupation]
-Background: [Brief description]
-Opinion: [Detailed opinion with specific feedback]
-
-[Continue for 3-5 personas]
-
-Summary: [Overall market assessment]
-"""
+        """Create the analysis prompt for OpenAI; instructions live in ANALYSIS_SYSTEM_PROMPT"""
+        return f'Analyze this product idea: "{product_idea}"'
     
-    def _parse_ai_response(self, raw_response: str) -> Dict[str, Any]:
-        """Parse OpenAI response into structured data"""
+    def _parse_ai_response(
+        self,
+        raw_response: str,
+        parser: Optional[AnalysisStreamParser] = None,
+        opinions: Optional[List[Dict[str, Any]]] = None
+    ) -> Dict[str, Any]:
+        """Parse OpenAI response into structured data, reusing a parser (and opinions) already built from the stream"""
         try:
+            if parser is None:
+                parser = AnalysisStreamParser()
+                parser.feed(raw_response)
+            parser.close()
+            
             # Extract personas
-            personas = self._extract_personas(raw_response)
+            personas = self._extract_personas(parser.persona_matches)
             
             # Extract opinions
-            opinions = self._extract_opinions(raw_response)
+            if opinions is None:
+                opinions = self._extract_opinions(parser.opinion_texts)
             
             # Extract summary
-            summary = self._extract_summary(raw_response)
+            summary = self._extract_summary(parser.summary_text)
             
             # Calculate sentiment breakdown
             sentiment_breakdown = self._calculate_sentiment_breakdown(opinions)
             
             # Assess market potential
-            market_potential = self._assess_market_potential(opinions)
+            market_potential = self._assess_market_potential(sentiment_breakdown)
             
             # Generate key insights and recommendations
             key_insights = self._generate_key_insights(personas, opinions)
@@ -157,15 +311,12 @@ Summary: [Overall market assessment]
             }
             
         except Exception as e:
-            print(f"Error parsing AI response: {e}")
+            logger.warning("Error parsing AI response: %s", e)
             return self._get_fallback_data("")
     
-    def _extract_personas(self, text: str) -> List[Dict[str, Any]]:
-        """Extract persona information from AI response"""
+    def _extract_personas(self, matches: List[Tuple[str, ...]]) -> List[Dict[str, Any]]:
+        """Build persona information from the parsed persona lines"""
         personas = []
-        persona_pattern = r"Persona \d+: ([^,]+), (\d+), ([^,]+), ([^\n]+)\nBackground: ([^\n]+)"
-        
-        matches = re.findall(persona_pattern, text)
         
         for i, match in enumerate(matches):
             personas.append({
@@ -200,41 +351,32 @@ Summary: [Overall market assessment]
         
         return personas
     
-    def _extract_opinions(self, text: str) -> List[Dict[str, Any]]:
-        """Extract opinions from AI response"""
-        opinions = []
-        opinion_pattern = r"Opinion: ([^\n]+)"
-        
-        matches = re.findall(opinion_pattern, text)
-        
-        for i, match in enumerate(matches):
-            opinions.append({
-                "id": i + 1,
-                "persona_id": (i % 3) + 1,  # Distribute across personas
-                "content": match.strip(),
-                "sentiment": self._analyze_sentiment(match)
-            })
-        
-        return opinions
+    def _extract_opinions(self, matches: List[str]) -> List[Dict[str, Any]]:
+        """Build opinions from the parsed opinion lines"""
+        return [self._build_opinion(i, match) for i, match in enumerate(matches)]
     
-    def _extract_summary(self, text: str) -> str:
-        """Extract summary from AI response"""
-        summary_pattern = r"Summary: ([^\n]+)"
-        match = re.search(summary_pattern, text)
-        
-        if match:
-            return match.group(1).strip()
+    def _build_opinion(self, index: int, text: str) -> Dict[str, Any]:
+        """Build the opinion for the index-th opinion line"""
+        return {
+            "id": index + 1,
+            "persona_id": (index % 3) + 1,  # Distribute across personas
+            "content": text.strip(),
+            "sentiment": self._analyze_sentiment(text)
+        }
+    
+    def _extract_summary(self, summary: Optional[str]) -> str:
+        """Use the parsed summary line, or a default when there was none"""
+        if summary:
+            return summary.strip()
         else:
             return "Analysis completed successfully. The product shows potential with mixed market reception."
     
     def _analyze_sentiment(self, text: str) -> str:
         """Simple sentiment analysis"""
-        positive_words = ["like", "love", "great", "good", "excellent", "amazing", "positive", "promising"]
-        negative_words = ["hate", "bad", "terrible", "awful", "dislike", "concern", "worry", "negative"]
-        
-        text_lower = text.lower()
-        positive_count = sum(1 for word in positive_words if word in text_lower)
-        negative_count = sum(1 for word in negative_words if word in text_lower)
+        # One scan for every keyword; each distinct keyword found counts once
+        found = {match.lower() for match in SENTIMENT_KEYWORD_PATTERN.findall(text)}
+        positive_count = len(found & POSITIVE_WORDS)
+        negative_count = len(found & NEGATIVE_WORDS)
         
         if positive_count > negative_count:
             return "positive"
@@ -245,30 +387,25 @@ Summary: [Overall market assessment]
     
     def _calculate_sentiment_breakdown(self, opinions: List[Dict[str, Any]]) -> Dict[str, int]:
         """Calculate sentiment distribution"""
-        sentiments = [opinion.get("sentiment", "neutral") for opinion in opinions]
-        
-        return {
-            "positive": sentiments.count("positive"),
-            "negative": sentiments.count("negative"),
-            "neutral": sentiments.count("neutral"),
-            "total": len(sentiments)
-        }
+        breakdown = {"positive": 0, "negative": 0, "neutral": 0, "total": len(opinions)}
+
+        # Single pass over the opinions instead of one .count() per sentiment
+        for opinion in opinions:
+            sentiment = opinion.get("sentiment", "neutral")
+            if sentiment in breakdown and sentiment != "total":
+                breakdown[sentiment] += 1
+
+        return breakdown
     
-    def _assess_market_potential(self, opinions: List[Dict[str, Any]]) -> str:
-        """Assess market potential based on opinions"""
-        if not opinions:
+    def _assess_market_potential(self, sentiment_breakdown: Dict[str, int]) -> str:
+        """Assess market potential from the sentiment breakdown of the opinions"""
+        total_count = sentiment_breakdown["total"]
+        if not total_count:
             return "unknown"
         
-        positive_count = sum(1 for op in opinions if op.get("sentiment") == "positive")
-        total_count = len(opinions)
-        positive_ratio = positive_count / total_count
+        positive_ratio = sentiment_breakdown["positive"] / total_count
         
-        if positive_ratio >= 0.7:
-            return "high"
-        elif positive_ratio >= 0.4:
-            return "medium"
-        else:
-            return "low"
+        return MARKET_POTENTIAL_LEVELS[bisect_right(MARKET_POTENTIAL_THRESHOLDS, positive_ratio)]
     
     def _generate_key_insights(self, personas: List[Dict[str, Any]], opinions: List[Dict[str, Any]]) -> List[str]:
         """Generate key insights"""
@@ -280,25 +417,16 @@ Summary: [Overall market assessment]
         if opinions:
             insights.append(f"Generated {len(opinions)} detailed opinions")
         
-        insights.append("Market analysis completed successfully")
+        insights.append(ANALYSIS_COMPLETED_INSIGHT)
         
         return insights
     
     def _generate_recommendations(self, opinions: List[Dict[str, Any]], market_potential: str) -> List[str]:
         """Generate actionable recommendations"""
-        recommendations = []
-        
-        if market_potential == "high":
-            recommendations.append("Strong market reception - consider proceeding with development")
-        elif market_potential == "medium":
-            recommendations.append("Mixed reception - consider addressing concerns before launch")
-        else:
-            recommendations.append("Low market reception - significant product iteration needed")
-        
-        recommendations.append("Conduct additional user research to validate findings")
-        recommendations.append("Develop targeted marketing strategy based on persona analysis")
-        
-        return recommendations
+        recommendation = MARKET_POTENTIAL_RECOMMENDATIONS.get(
+            market_potential, MARKET_POTENTIAL_RECOMMENDATIONS["low"]
+        )
+        return [recommendation, *FOLLOW_UP_RECOMMENDATIONS]
     
     def _get_fallback_data(self, product_idea: str) -> Dict[str, Any]:
         """Fallback data if OpenAI fails"""
@@ -371,168 +499,95 @@ Summary: [Overall market assessment]
         }
 
     def _create_ranking_prompt(self, idea: str, personas: List[Dict[str, Any]]) -> str:
-        """Create the ranking prompt for OpenAI using predefined personas"""
-        persona_list = "\n".join([
-            f"- {p['name']} ({p['title']}, {p['location']}, {p['industry']}) - Expertise: {', '.join(p['expertise'])}"
+        """Create the ranking prompt for OpenAI; instructions live in RANKING_SYSTEM_PROMPT"""
+        # Personas are sampled per request, so cache each line rather than the whole list
+        persona_list = "\n".join(
+            _trusted_persona_line(p["id"]) or _format_persona_line(p)
             for p in personas
-        ])
+        )
         
-        return f"""
-Analyze and rank this product idea: "{idea}"
+        return f"""Analyze and rank this product idea: "{idea}"
 
-You will evaluate this idea from the perspective of these specific personas:
+Evaluate this idea from the perspective of these specific personas (persona id in brackets):
 
 {persona_list}
-
-For each persona, provide a detailed evaluation in this exact format:
-
-ENHANCED IDEA: [Enhanced version of the original idea with specific details, target market, and value proposition]
-
-PERSONA EVALUATIONS:
-
-Persona: {personas[0]['name']}
-Title: {personas[0]['title']}
-Location: {personas[0]['location']}
-Industry: {personas[0]['industry']}
-Expertise: {', '.join(personas[0]['expertise'])}
-Experience: {personas[0]['experience']}
-Relevance Score: [0.0-1.0]
-Rating: [1-10]
-Sentiment: [positive/neutral/negative]
-Key Insight: [Most important insight from this persona's perspective]
-Detailed Analysis: [Comprehensive explanation of why they think it's good/bad, including specific reasoning based on their expertise and experience]
-
-Persona: {personas[1]['name']}
-Title: {personas[1]['title']}
-Location: {personas[1]['location']}
-Industry: {personas[1]['industry']}
-Expertise: {', '.join(personas[1]['expertise'])}
-Experience: {personas[1]['experience']}
-Relevance Score: [0.0-1.0]
-Rating: [1-10]
-Sentiment: [positive/neutral/negative]
-Key Insight: [Most important insight from this persona's perspective]
-Detailed Analysis: [Comprehensive explanation of why they think it's good/bad, including specific reasoning based on their expertise and experience]
-
-[Continue for all personas]
-
-SUMMARY:
-Average Rating: [X.X]
-Overall Sentiment: [positive/neutral/negative]
-Top Concerns: [List 3-5 main concerns raised]
-Top Opportunities: [List 3-5 main opportunities identified]
-
-IMPORTANT: Do not use asterisks, dashes, or markdown formatting. Use plain text only.
 """
 
     def _parse_ranking_response(self, raw_response: str, original_idea: str, personas: List[Dict[str, Any]]) -> Dict[str, Any]:
-        """Parse OpenAI ranking response into structured data"""
+        """Parse OpenAI JSON ranking response into structured data"""
         try:
-            # Extract enhanced idea
-            enhanced_idea = self._extract_enhanced_idea(raw_response, original_idea)
-            
-            # Extract persona evaluations
-            persona_evaluations = self._extract_persona_evaluations_structured(raw_response, personas)
-            
-            # Extract summary
-            summary = self._extract_ranking_summary(raw_response)
-            
-            return {
-                "enhanced_idea": enhanced_idea,
-                "results": persona_evaluations,
-                "summary": summary,
-                "raw_response": raw_response
-            }
-            
-        except Exception as e:
-            print(f"Error parsing ranking response: {e}")
-            return self._get_fallback_ranking_data(original_idea, personas)
-
-    def _extract_enhanced_idea(self, text: str, original_idea: str) -> str:
-        """Extract enhanced idea from response"""
-        enhanced_pattern = r"ENHANCED IDEA:\s*([^\n]+)"
-        match = re.search(enhanced_pattern, text, re.IGNORECASE)
+            ranking = RankingOutput.model_validate_json(raw_response)
+        except ValidationError:
+            # Legacy models may wrap the object in prose or code fences
+            match = JSON_OBJECT_PATTERN.search(raw_response or "")
+            if not match:
+                logger.warning("Error parsing ranking response: no JSON object found")
+                return self._get_fallback_ranking_data(original_idea, personas)
+            try:
+                ranking = RankingOutput.model_validate_json(match.group(0))
+            except ValidationError as e:
+                logger.warning("Error parsing ranking response: %s", e)
+                return self._get_fallback_ranking_data(original_idea, personas)
         
-        if match:
-            return match.group(1).strip()
-        else:
-            return f"Enhanced version of: {original_idea}"
+        return {
+            "enhanced_idea": ranking.enhanced_idea or f"Enhanced version of: {original_idea}",
+            "results": self._build_persona_evaluations(ranking, personas),
+            "summary": {
+                "averageRating": ranking.summary.average_rating,
+                "overallSentiment": ranking.summary.overall_sentiment.lower(),
+                "topConcerns": self._top_summary_items(ranking.summary.top_concerns),
+                "topOpportunities": self._top_summary_items(ranking.summary.top_opportunities)
+            },
+            "raw_response": raw_response
+        }
+
+    def _top_summary_items(self, items: List[str]) -> List[str]:
+        """Drop repeated summary points, keeping first-seen order and at most MAX_SUMMARY_ITEMS"""
+        # Key on case/punctuation-insensitive text so near-identical phrasings collapse;
+        # the first phrasing seen is the one kept
+        unique: Dict[str, str] = {}
+        for item in items:
+            key = " ".join(SUMMARY_ITEM_NOISE_PATTERN.sub(" ", item.lower()).split())
+            unique.setdefault(key, item)
+            if len(unique) == MAX_SUMMARY_ITEMS:
+                break
+        return list(unique.values())
 
-    def _extract_persona_evaluations_structured(self, text: str, personas: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Extract persona evaluations from structured response using predefined personas"""
+    def _build_persona_evaluations(self, ranking: RankingOutput, personas: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Match evaluations from the model back to the predefined personas"""
+        personas_by_id = {p["id"]: p for p in personas}
         evaluations = []
         
-        # Split by "Persona:" sections
-        persona_sections = re.split(r'Persona:', text)
-        
-        for i, section in enumerate(persona_sections[1:], 0):  # Skip first empty section
-            if i >= len(personas):
-                break
-                
+        for raw_evaluation in ranking.evaluations:
             try:
-                persona = personas[i]
-                lines = section.strip().split('\n')
-                
-                # Extract fields from the structured format
-                relevance_score = float(self._extract_field_value(lines, "Relevance Score:", "0.8"))
-                rating = int(self._extract_field_value(lines, "Rating:", "7"))
-                sentiment = self._extract_field_value(lines, "Sentiment:", "neutral")
-                key_insight = self._extract_field_value(lines, "Key Insight:", "Product shows potential")
-                detailed_analysis = self._extract_field_value(lines, "Detailed Analysis:", "Detailed analysis of market fit")
-                
-                evaluations.append({
-                    "persona": {
-                        "id": persona["id"],
-                        "name": persona["name"],
-                        "title": persona["title"],
-                        "location": persona["location"],
-                        "industry": persona["industry"],
-                        "expertise": persona["expertise"],
-                        "experience": persona["experience"]
-                    },
-                    "relevanceScore": relevance_score,
-                    "rating": rating,
-                    "sentiment": sentiment,
-                    "keyInsight": key_insight,
-                    "reason": detailed_analysis
-                })
-                
-            except Exception as e:
-                print(f"Error parsing persona {i}: {e}")
+                evaluation = RankedPersonaOutput.model_validate(raw_evaluation)
+            except ValidationError as e:
+                logger.warning("Skipping malformed persona evaluation: %s", e)
                 continue
+            persona = personas_by_id.pop(evaluation.persona_id, None)
+            if persona is None:
+                continue
+            evaluations.append({
+                "persona": self._persona_card(persona),
+                "relevanceScore": evaluation.relevance_score,
+                "rating": evaluation.rating,
+                "sentiment": evaluation.sentiment.lower(),
+                "keyInsight": evaluation.key_insight,
+                "reason": evaluation.detailed_analysis
+            })
         
-        # If no evaluations found, create fallback using provided personas
+        # If no evaluations matched, create fallback using provided personas
         if not evaluations:
             evaluations = self._create_fallback_evaluations_from_personas(personas)
         
         return evaluations
 
-    def _extract_field_value(self, lines: List[str], field_name: str, default: str) -> str:
-        """Extract value for a specific field from lines"""
-        for line in lines:
-            if field_name in line:
-                return line.split(field_name, 1)[1].strip()
-        return default
-
-    def _extract_ranking_summary(self, text: str) -> Dict[str, Any]:
-        """Extract ranking summary from response"""
-        summary_pattern = r"SUMMARY:\s*\nAverage Rating:\s*([0-9.]+)\s*\nOverall Sentiment:\s*(\w+)\s*\nTop Concerns:\s*([^\n]+)\s*\nTop Opportunities:\s*([^\n]+)"
-        match = re.search(summary_pattern, text, re.IGNORECASE | re.DOTALL)
-        
-        if match:
-            return {
-                "averageRating": float(match.group(1)),
-                "overallSentiment": match.group(2).lower(),
-                "topConcerns": [concern.strip() for concern in match.group(3).split(',')],
-                "topOpportunities": [opp.strip() for opp in match.group(4).split(',')]
-            }
-        else:
-            return {
-                "averageRating": 7.0,
-                "overallSentiment": "neutral",
-                "topConcerns": ["Market competition", "Implementation complexity", "User adoption"],
-                "topOpportunities": ["Strong market demand", "Innovative approach", "Scalable model"]
-            }
+    def _persona_card(self, persona: Dict[str, Any]) -> PersonaCard:
+        """Get the card for a persona, reusing the prebuilt card for known personas"""
+        card = _trusted_persona_card(persona["id"])
+        if card is None:
+            card = PersonaCard(**{field: persona[field] for field in PERSONA_CARD_FIELDS})
+        return card
 
     def _create_default_persona_evaluations(self) -> List[Dict[str, Any]]:
         """Create default persona evaluations"""
@@ -576,15 +631,7 @@ IMPORTANT: Do not use asterisks, dashes, or markdown formatting. Use plain text
         evaluations = []
         for i, persona in enumerate(personas):
             evaluations.append({
-                "persona": {
-                    "id": persona["id"],
-                    "name": persona["name"],
-                    "title": persona["title"],
-                    "location": persona["location"],
-                    "industry": persona["industry"],
-                    "expertise": persona["expertise"],
-                    "experience": persona["experience"]
-                },
+                "persona": self._persona_card(persona),
                 "relevanceScore": 0.8,
                 "rating": 7,
                 "sentiment": "neutral",
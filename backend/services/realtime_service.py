@@ -1,20 +1,87 @@
+from collections import deque
 from fastapi import WebSocket
-from typing import Dict, List
-import json
+from pydantic import BaseModel
+from typing import Deque, Dict, Optional, Set, Tuple
 import asyncio
+import logging
+import orjson
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Message types a lagging client may lose. Raw text chunks are superseded by
+# the final results; parsed opinions and running sentiment are not resent,
+# so they are never shed.
+DROPPABLE_MESSAGE_TYPES = frozenset({"analysis_chunk"})
+
+class Outbox:
+    """Bounded outgoing buffer for one connection; producers never wait on it"""
+    
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        # (droppable, payload) in send order
+        self._entries: Deque[Tuple[bool, str]] = deque()
+        self._ready = asyncio.Event()
+        self.closed = False
+        self.writer: Optional[asyncio.Task] = None
+    
+    def put(self, payload: str, droppable: bool) -> bool:
+        """Buffer a payload; returns False when a non-droppable one can't fit"""
+        if self.closed:
+            return True
+        if len(self._entries) >= self.maxsize and not self._evict_chunk():
+            # Nothing left to shed: drop a new chunk, refuse anything else
+            return droppable
+        self._entries.append((droppable, payload))
+        self._ready.set()
+        return True
+    
+    def _evict_chunk(self) -> bool:
+        """Drop the oldest droppable entry, keeping every other message"""
+        for index, (droppable, _) in enumerate(self._entries):
+            if droppable:
+                del self._entries[index]
+                return True
+        return False
+    
+    async def get(self) -> Optional[str]:
+        """Wait for the next payload; None once the outbox is closed"""
+        while not self._entries:
+            if self.closed:
+                return None
+            self._ready.clear()
+            await self._ready.wait()
+        return self._entries.popleft()[1]
+    
+    def close(self):
+        """Discard pending payloads and release the writer"""
+        self.closed = True
+        self._entries.clear()
+        self._ready.set()
+        if self.writer is not None and self.writer is not asyncio.current_task():
+            self.writer.cancel()
 
 class RealtimeService:
     def __init__(self):
-        self.active_connections: Dict[int, List[WebSocket]] = {}
+        # session_id -> {websocket: outgoing message buffer}
+        self.active_connections: Dict[int, Dict[WebSocket, Outbox]] = {}
+        # Kept in step with connect/disconnect so the total is O(1) to read
+        self._connection_count = 0
+        # Close handshakes for clients dropped for falling behind
+        self._closing: Set[asyncio.Task] = set()
     
     async def connect(self, websocket: WebSocket, session_id: int):
         """Accept WebSocket connection and add to active connections"""
         await websocket.accept()
         
-        if session_id not in self.active_connections:
-            self.active_connections[session_id] = []
-        
-        self.active_connections[session_id].append(websocket)
+        outbox = Outbox(settings.ws_message_queue_size)
+        connections = self.active_connections.setdefault(session_id, {})
+        previous = connections.get(websocket)
+        if previous is None:
+            self._connection_count += 1
+        else:
+            previous.close()
+        connections[websocket] = outbox
         
         # Send initial connection confirmation
         await self.send_to_session(session_id, {
@@ -25,13 +92,37 @@ class RealtimeService:
     
     def disconnect(self, websocket: WebSocket, session_id: int):
         """Remove WebSocket connection"""
-        if session_id in self.active_connections:
-            try:
-                self.active_connections[session_id].remove(websocket)
-                if not self.active_connections[session_id]:
-                    del self.active_connections[session_id]
-            except ValueError:
-                pass  # Connection not in list
+        connections = self.active_connections.get(session_id)
+        if connections is not None:
+            outbox = connections.pop(websocket, None)
+            if outbox is not None:
+                self._connection_count -= 1
+                outbox.close()
+            if not connections:
+                del self.active_connections[session_id]
+    
+    async def run_writer(self, websocket: WebSocket, session_id: int):
+        """Drain a connection's outbox so producers never await a slow client"""
+        outbox = (self.active_connections.get(session_id) or {}).get(websocket)
+        if outbox is None:
+            return
+        outbox.writer = asyncio.current_task()
+        
+        try:
+            while True:
+                payload = await outbox.get()
+                if payload is None:
+                    return
+                await websocket.send_text(payload)
+        except Exception as e:
+            logger.warning("Error sending message to WebSocket: %s", e)
+            self.disconnect(websocket, session_id)
+    
+    async def send_to_connection(self, websocket: WebSocket, session_id: int, message: dict):
+        """Queue a message for a single connection"""
+        outbox = (self.active_connections.get(session_id) or {}).get(websocket)
+        if outbox is not None:
+            self._enqueue(websocket, session_id, outbox, orjson.dumps(message).decode(), droppable=False)
     
     async def broadcast_status(self, session_id: int, status: str, progress: int):
         """Broadcast processing status update"""
@@ -45,12 +136,36 @@ class RealtimeService:
         
         await self.send_to_session(session_id, message)
     
-    async def broadcast_results(self, session_id: int, results: dict):
+    async def broadcast_results(self, session_id: int, results: BaseModel):
         """Broadcast analysis results"""
+        # Serialize the model straight to JSON and embed it, rather than copying it into a dict first
         message = {
             "type": "results",
             "session_id": session_id,
-            "data": results,
+            "data": orjson.Fragment(results.model_dump_json()),
+            "timestamp": asyncio.get_event_loop().time()
+        }
+        
+        await self.send_to_session(session_id, message)
+    
+    async def broadcast_chunk(self, session_id: int, delta: str):
+        """Broadcast a streamed fragment of the analysis text"""
+        message = {
+            "type": "analysis_chunk",
+            "session_id": session_id,
+            "delta": delta,
+            "timestamp": asyncio.get_event_loop().time()
+        }
+        
+        await self.send_to_session(session_id, message)
+    
+    async def broadcast_opinion(self, session_id: int, opinion: dict, sentiment_breakdown: dict):
+        """Broadcast an opinion parsed mid-stream with the running sentiment breakdown"""
+        message = {
+            "type": "opinion",
+            "session_id": session_id,
+            "opinion": opinion,
+            "sentiment_breakdown": sentiment_breakdown,
             "timestamp": asyncio.get_event_loop().time()
         }
         
@@ -69,29 +184,51 @@ class RealtimeService:
     
     async def send_to_session(self, session_id: int, message: dict):
         """Send message to all connections for a specific session"""
-        if session_id in self.active_connections:
-            connections_to_remove = []
-            
-            for connection in self.active_connections[session_id]:
-                try:
-                    await connection.send_text(json.dumps(message))
-                except Exception as e:
-                    print(f"Error sending message to WebSocket: {e}")
-                    connections_to_remove.append(connection)
-            
-            # Remove broken connections
-            for connection in connections_to_remove:
-                self.disconnect(connection, session_id)
+        connections = self.active_connections.get(session_id)
+        if not connections:
+            return
+        
+        # Encode once and hand the payload to each connection's writer task.
+        # Only streamed chunks may be shed when a client falls behind.
+        payload = orjson.dumps(message).decode()
+        droppable = message.get("type") in DROPPABLE_MESSAGE_TYPES
+        for websocket, outbox in list(connections.items()):
+            self._enqueue(websocket, session_id, outbox, payload, droppable)
+    
+    def _enqueue(self, websocket: WebSocket, session_id: int, outbox: Outbox, payload: str, droppable: bool):
+        """Buffer a payload without waiting; drop the client if it can't keep up"""
+        if outbox.put(payload, droppable):
+            return
+        logger.warning("WebSocket client for session %s fell too far behind; closing it", session_id)
+        self.disconnect(websocket, session_id)
+        task = asyncio.create_task(self._close_quietly(websocket))
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+    
+    @staticmethod
+    async def _close_quietly(websocket: WebSocket):
+        """Close a dropped client's socket, ignoring one that is already gone"""
+        try:
+            # A stalled client may never take the close frame either
+            await asyncio.wait_for(websocket.close(code=1013), timeout=5.0)
+        except Exception:
+            pass
     
     async def broadcast_to_all(self, message: dict):
         """Broadcast message to all active connections"""
-        for session_id in list(self.active_connections.keys()):
-            await self.send_to_session(session_id, message)
+        # Sessions are independent, so don't wait on one session's queues before the next
+        await asyncio.gather(
+            *[self.send_to_session(session_id, message) for session_id in list(self.active_connections)],
+            return_exceptions=True
+        )
     
     def get_active_connections_count(self) -> int:
         """Get total number of active connections"""
-        return sum(len(connections) for connections in self.active_connections.values())
+        return self._connection_count
     
     def get_session_connections_count(self, session_id: int) -> int:
         """Get number of connections for a specific session"""
-        return len(self.active_connections.get(session_id, []))
+        return len(self.active_connections.get(session_id, ()))
+
+# Shared instance so broadcasts from services reach sockets opened by the WebSocket router
+realtime_service = RealtimeService()
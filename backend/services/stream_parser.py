@@ -0,0 +1,63 @@
+"""
+Stream Parser for the free-text analysis response.
+Matches complete lines as the completion streams in, so parsing overlaps
+the network instead of rescanning the whole response once it has finished.
+"""
+import re
+from typing import List, Optional, Tuple
+
+# Line formats requested by ANALYSIS_SYSTEM_PROMPT
+PERSONA_LINE_PATTERN = re.compile(r"Persona \d+: ([^,]+), (\d+), ([^,]+), (.+)")
+BACKGROUND_LINE_PATTERN = re.compile(r"Background: (.+)")
+OPINION_PATTERN = re.compile(r"Opinion: ([^\n]+)")
+SUMMARY_PATTERN = re.compile(r"Summary: ([^\n]+)")
+
+class AnalysisStreamParser:
+    """Incremental, line-based parser for the persona/opinion/summary format"""
+
+    def __init__(self):
+        self._buffer = ""
+        self._pending_persona: Optional[Tuple[str, ...]] = None
+        # (name, age, location, occupation, background) per persona
+        self.persona_matches: List[Tuple[str, ...]] = []
+        self.opinion_texts: List[str] = []
+        self.summary_text: Optional[str] = None
+
+    def feed(self, delta: str) -> List[str]:
+        """Consume a streamed text fragment; returns the opinions it completed"""
+        self._buffer += delta
+        if "\n" not in delta:
+            return []
+        *lines, self._buffer = self._buffer.split("\n")
+        return self._consume(lines)
+
+    def close(self) -> List[str]:
+        """Parse the trailing partial line at the end of the stream"""
+        line, self._buffer = self._buffer, ""
+        if line:
+            return self._consume([line])
+        return []
+
+    def _consume(self, lines: List[str]) -> List[str]:
+        """Match complete lines against the expected formats"""
+        completed = len(self.opinion_texts)
+        for line in lines:
+            # A persona header only counts when its Background line follows directly
+            pending, self._pending_persona = self._pending_persona, None
+            if pending is not None:
+                background = BACKGROUND_LINE_PATTERN.match(line)
+                if background:
+                    self.persona_matches.append(pending + (background.group(1),))
+
+            persona = PERSONA_LINE_PATTERN.search(line)
+            if persona:
+                self._pending_persona = persona.groups()
+
+            self.opinion_texts.extend(OPINION_PATTERN.findall(line))
+
+            if self.summary_text is None:
+                summary = SUMMARY_PATTERN.search(line)
+                if summary:
+                    self.summary_text = summary.group(1)
+
+        return self.opinion_texts[completed:]
@@ -6,15 +6,40 @@ USE WAREHOUSE NEXUS_WH;
 USE DATABASE NEXUS_DB;
 USE SCHEMA NEXUS_SC;
 
+-- Session ids come from a sequence so the API can draw the id before inserting
+-- instead of looking the new row up afterwards. ORDER keeps ids increasing in
+-- creation order, which the newest-first session listing relies on.
+CREATE SEQUENCE IF NOT EXISTS SESSIONS_ID_SEQ START = 1 INCREMENT = 1 ORDER;
+-- A sequence created before ORDER was specified
+ALTER SEQUENCE SESSIONS_ID_SEQ SET ORDER;
+
 -- Create SESSIONS table
 CREATE TABLE IF NOT EXISTS SESSIONS (
-    ID INTEGER IDENTITY PRIMARY KEY,
+    ID INTEGER DEFAULT SESSIONS_ID_SEQ.NEXTVAL PRIMARY KEY,
     PRODUCT_IDEA TEXT NOT NULL,
     STATUS VARCHAR(20) DEFAULT 'processing',
     CREATED_AT TIMESTAMP_NTZ DEFAULT CURRENT_TIMESTAMP(),
     UPDATED_AT TIMESTAMP_NTZ DEFAULT CURRENT_TIMESTAMP()
 );
 
+-- Migration: a SESSIONS table created with an IDENTITY id already holds ids the
+-- new sequence would hand out again, and Snowflake does not enforce PRIMARY
+-- KEY. Restart the sequence past the highest existing id. Safe to re-run: it
+-- does nothing once the sequence is ahead. Run it before deploying the API
+-- version that inserts sequence ids.
+EXECUTE IMMEDIATE $$
+DECLARE
+    next_id INTEGER;
+    sequence_next INTEGER;
+BEGIN
+    SELECT COALESCE(MAX(ID), 0) + 1 INTO :next_id FROM SESSIONS;
+    SELECT SESSIONS_ID_SEQ.NEXTVAL INTO :sequence_next;
+    IF (sequence_next < next_id) THEN
+        EXECUTE IMMEDIATE 'CREATE OR REPLACE SEQUENCE SESSIONS_ID_SEQ START = ' || next_id || ' INCREMENT = 1 ORDER';
+    END IF;
+END;
+$$;
+
 -- Create ANALYSIS_RESULTS table
 CREATE TABLE IF NOT EXISTS ANALYSIS_RESULTS (
     ID INTEGER IDENTITY PRIMARY KEY,
@@ -27,7 +52,12 @@ CREATE TABLE IF NOT EXISTS ANALYSIS_RESULTS (
     CONFIDENCE_SCORE FLOAT,
     CREATED_AT TIMESTAMP_NTZ DEFAULT CURRENT_TIMESTAMP(),
     FOREIGN KEY (SESSION_ID) REFERENCES SESSIONS(ID)
-);
+)
+-- Results are always read as the latest row for one session
+CLUSTER BY (SESSION_ID, CREATED_AT);
+
+-- For a table created before the clustering key was added:
+-- ALTER TABLE ANALYSIS_RESULTS CLUSTER BY (SESSION_ID, CREATED_AT);
 
 -- Create ELEVENLABS_AGENTS table for voice consultation
 CREATE TABLE IF NOT EXISTS ELEVENLABS_AGENTS (
@@ -63,6 +93,5 @@ CREATE TABLE IF NOT EXISTS VOICE_CONSULTATIONS (
 -- Note: Standard Snowflake tables do not support CREATE INDEX.
 -- For performance tuning, consider CLUSTER BY, e.g.:
 -- ALTER TABLE SESSIONS CLUSTER BY (CREATED_AT);
--- ALTER TABLE ANALYSIS_RESULTS CLUSTER BY (SESSION_ID, CREATED_AT);
 -- ALTER TABLE ELEVENLABS_AGENTS CLUSTER BY (PERSONA_ID);
 -- ALTER TABLE VOICE_CONSULTATIONS CLUSTER BY (CREATED_AT, PERSONA_ID);